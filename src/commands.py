@@ -1,98 +1,130 @@
 # cache_server/commands.py
 from __future__ import annotations
 
+import sys
 from typing import Callable
 
 import state as _state_module
-from protocol import BulkString, RESPArray, RESPError, RESPValue, SimpleString
-from state import _lock
+from protocol import EMPTY_ARRAY, NIL, OK, PONG, BulkString, BulkStringArray, RESPError, RESPValue, SimpleString
 from store import (
+    CommandError,
+    WrongTypeError,
     store_delete,
     store_exists,
     store_get,
     store_keys,
+    store_mget,
     store_set,
     store_ttl,
 )
 
-OK = SimpleString("OK")
-PONG = SimpleString("PONG")
+_ERR_NOT_INTEGER = "ERR value is not an integer or out of range"
 
 
-async def handle_ping(args: list[str]) -> RESPValue:
+def _as_string(value: object) -> str | None:
+    """String form of a string-type value, or None for hashes and zsets."""
+    if type(value) is str:
+        return value
+    # INCR stores counters as int; only the reply needs the string form
+    if type(value) is int:
+        return str(value)
+    return None
+
+
+def handle_ping(args: list[str]) -> RESPValue:
     return SimpleString(args[0]) if args else PONG
 
 
-async def handle_set(args: list[str]) -> RESPValue:
+def handle_set(args: list[str]) -> RESPValue:
     if len(args) < 2:
         return RESPError("ERR wrong number of arguments for SET")
 
     key, value = args[0], args[1]
     ttl = None
 
-    opts = {args[i].upper(): args[i + 1] for i in range(2, len(args) - 1, 2)}
-    if "EX" in opts:
-        ttl = float(opts["EX"])
-    elif "PX" in opts:
-        ttl = float(opts["PX"]) / 1000
+    opts = dict(zip(map(str.upper, args[2::2]), args[3::2]))
+    try:
+        if "EX" in opts:
+            ttl = float(opts["EX"])
+        elif "PX" in opts:
+            ttl = float(opts["PX"]) / 1000
+    except ValueError:
+        raise CommandError(_ERR_NOT_INTEGER) from None
 
-    async with _lock:
-        _state_module._store = store_set(_state_module._store, key, value, ttl)
+    _state_module._store = store_set(_state_module._store, key, value, ttl)
     return OK
 
 
-async def handle_get(args: list[str]) -> RESPValue:
+def handle_get(args: list[str]) -> RESPValue:
     if not args:
         return RESPError("ERR wrong number of arguments for GET")
-    entry = store_get(_state_module._store, args[0])
-    return BulkString(entry.value if entry else None)
+    value = store_get(_state_module._store, args[0])
+    if value is None:
+        return NIL
+    text = _as_string(value)
+    if text is None:
+        raise WrongTypeError()
+    return BulkString(text)
 
 
-async def handle_del(args: list[str]) -> RESPValue:
-    async with _lock:
-        _state_module._store, count = store_delete(_state_module._store, *args)
+def handle_mget(args: list[str]) -> RESPValue:
+    if not args:
+        return RESPError("ERR wrong number of arguments for MGET")
+    values = store_mget(_state_module._store, args)
+    # Unlike GET, MGET reads hashes and zsets as nil instead of failing
+    return BulkStringArray(tuple(map(_as_string, values)))
+
+
+def handle_del(args: list[str]) -> RESPValue:
+    _state_module._store, count = store_delete(_state_module._store, *args)
     return count
 
 
-async def handle_exists(args: list[str]) -> RESPValue:
+def handle_exists(args: list[str]) -> RESPValue:
     return store_exists(_state_module._store, *args)
 
 
-async def handle_keys(args: list[str]) -> RESPValue:
+def handle_keys(args: list[str]) -> RESPValue:
     pattern = args[0] if args else "*"
     keys = store_keys(_state_module._store, pattern)
-    return RESPArray(tuple(BulkString(k) for k in keys))
+    return BulkStringArray(tuple(keys)) if keys else EMPTY_ARRAY
 
 
-async def handle_ttl(args: list[str]) -> RESPValue:
+def handle_ttl(args: list[str]) -> RESPValue:
     if not args:
         return RESPError("ERR wrong number of arguments for TTL")
     return store_ttl(_state_module._store, args[0])
 
 
-async def handle_incr(args: list[str]) -> RESPValue:
+def handle_incr(args: list[str]) -> RESPValue:
     if not args:
         return RESPError("ERR wrong number of arguments for INCR")
     key = args[0]
-    async with _lock:
-        entry = store_get(_state_module._store, key)
-        try:
-            new_val = int(entry.value if entry else 0) + 1
-        except ValueError:
-            return RESPError("ERR value is not an integer")
-        _state_module._store = store_set(_state_module._store, key, str(new_val))
+    current = store_get(_state_module._store, key)
+    if current is None:
+        current = 0
+    if type(current) is not int and type(current) is not str:
+        raise WrongTypeError()
+    try:
+        new_val = int(current) + 1
+    except ValueError:
+        return RESPError("ERR value is not an integer")
+    _state_module._store = store_set(_state_module._store, key, new_val)
     return new_val
 
 
-async def handle_expire(args: list[str]) -> RESPValue:
+def handle_expire(args: list[str]) -> RESPValue:
     if len(args) < 2:
         return RESPError("ERR wrong number of arguments for EXPIRE")
-    key, seconds = args[0], int(args[1])
-    async with _lock:
-        entry = store_get(_state_module._store, key)
-        if entry is None:
-            return 0
-        _state_module._store = store_set(_state_module._store, key, entry.value, float(seconds))
+    key = args[0]
+    try:
+        seconds = int(args[1])
+    except ValueError:
+        raise CommandError(_ERR_NOT_INTEGER) from None
+    value = store_get(_state_module._store, key)
+    if value is None:
+        return 0
+    _state_module._store = store_set(_state_module._store, key, value, float(seconds))
     return 1
 
 
@@ -100,6 +132,7 @@ COMMAND_REGISTRY: dict[str, Callable] = {
     "PING": handle_ping,
     "SET": handle_set,
     "GET": handle_get,
+    "MGET": handle_mget,
     "DEL": handle_del,
     "EXISTS": handle_exists,
     "KEYS": handle_keys,
@@ -117,12 +150,22 @@ from zset_commands import ZSET_COMMAND_REGISTRY  # noqa: E402
 
 COMMAND_REGISTRY.update(ZSET_COMMAND_REGISTRY)
 
+# Clients send command names either all-upper or all-lower; registering both
+# spellings lets dispatch skip the .upper() call for the common case.  The
+# generated lowercase keys are interned like the literal uppercase ones.
+COMMAND_REGISTRY.update({sys.intern(name.lower()): handler for name, handler in COMMAND_REGISTRY.items()})
+
 
-async def dispatch(raw_args: list[str]) -> RESPValue:
+def dispatch(raw_args: list[str]) -> RESPValue:
     if not raw_args:
         return RESPError("ERR empty command")
-    cmd = raw_args[0].upper()
-    handler = COMMAND_REGISTRY.get(cmd)
+    handler = COMMAND_REGISTRY.get(raw_args[0])
     if handler is None:
-        return RESPError(f"ERR unknown command '{cmd}'")
-    return await handler(raw_args[1:])
+        cmd = raw_args[0].upper()
+        handler = COMMAND_REGISTRY.get(cmd)
+        if handler is None:
+            return RESPError(f"ERR unknown command '{cmd}'")
+    try:
+        return handler(raw_args[1:])
+    except CommandError as e:
+        return RESPError(str(e))
@@ -19,12 +19,9 @@ from hash_store import (
     hash_strlen,
     hash_vals,
 )
-from protocol import BulkString, RESPArray, RESPError, RESPValue, SimpleString
-from state import _lock
+from protocol import EMPTY_ARRAY, NIL, OK, BulkString, BulkStringArray, RESPArray, RESPError, RESPValue
 import state as _state_module
 
-OK = SimpleString("OK")
-
 
 # ---------------------------------------------------------------------------
 # Internal helpers
@@ -36,18 +33,11 @@ def _err(msg: str) -> RESPError:
 
 
 def _bulk(v: str | None) -> BulkString:
-    return BulkString(v)
-
-
-def _to_array(items: list[str | None]) -> RESPArray:
-    return RESPArray(tuple(_bulk(i) for i in items))
+    return BulkString(v) if v is not None else NIL
 
 
-def _wrong_type_check(result) -> RESPError | None:
-    """If result is an error string (from _get_hash), wrap it."""
-    if isinstance(result, str) and result.startswith("WRONGTYPE"):
-        return RESPError(result)
-    return None
+def _to_array(items: list[str | None]) -> BulkStringArray:
+    return BulkStringArray(tuple(items)) if items else EMPTY_ARRAY
 
 
 # ---------------------------------------------------------------------------
@@ -55,136 +45,104 @@ def _wrong_type_check(result) -> RESPError | None:
 # ---------------------------------------------------------------------------
 
 
-async def handle_hset(args: list[str]) -> RESPValue:
+def handle_hset(args: list[str]) -> RESPValue:
     # HSET key field value [field value ...]
     if len(args) < 3 or len(args) % 2 == 0:
         return _err("ERR wrong number of arguments for HSET")
     key = args[0]
-    pairs = [(args[i], args[i + 1]) for i in range(1, len(args), 2)]
-    async with _lock:
-        new_store, result = hash_set(_state_module._store, key, pairs)
-        _state_module._store = new_store
-    if isinstance(result, str):
-        return _err(result)
+    pairs = list(zip(args[1::2], args[2::2]))
+    result = hash_set(_state_module._store, key, pairs)
     return result  # int: number of new fields added
 
 
-async def handle_hmset(args: list[str]) -> RESPValue:
+def handle_hmset(args: list[str]) -> RESPValue:
     # HMSET key field value [field value ...] — deprecated alias, returns OK
     if len(args) < 3 or len(args) % 2 == 0:
         return _err("ERR wrong number of arguments for HMSET")
     key = args[0]
-    pairs = [(args[i], args[i + 1]) for i in range(1, len(args), 2)]
-    async with _lock:
-        new_store, result = hash_set(_state_module._store, key, pairs)
-        _state_module._store = new_store
-    if isinstance(result, str):
-        return _err(result)
+    pairs = list(zip(args[1::2], args[2::2]))
+    hash_set(_state_module._store, key, pairs)
     return OK
 
 
-async def handle_hsetnx(args: list[str]) -> RESPValue:
+def handle_hsetnx(args: list[str]) -> RESPValue:
     # HSETNX key field value
     if len(args) != 3:
         return _err("ERR wrong number of arguments for HSETNX")
     key, field, value = args
-    async with _lock:
-        new_store, result = hash_setnx(_state_module._store, key, field, value)
-        _state_module._store = new_store
-    if isinstance(result, str):
-        return _err(result)
+    result = hash_setnx(_state_module._store, key, field, value)
     return result  # 0 or 1
 
 
-async def handle_hget(args: list[str]) -> RESPValue:
+def handle_hget(args: list[str]) -> RESPValue:
     # HGET key field
     if len(args) != 2:
         return _err("ERR wrong number of arguments for HGET")
     result = hash_get(_state_module._store, args[0], args[1])
-    if isinstance(result, str) and result.startswith("WRONGTYPE"):
-        return _err(result)
     return _bulk(result)
 
 
-async def handle_hmget(args: list[str]) -> RESPValue:
+def handle_hmget(args: list[str]) -> RESPValue:
     # HMGET key field [field ...]
     if len(args) < 2:
         return _err("ERR wrong number of arguments for HMGET")
     result = hash_mget(_state_module._store, args[0], *args[1:])
-    if isinstance(result, str):
-        return _err(result)
     return _to_array(result)
 
 
-async def handle_hdel(args: list[str]) -> RESPValue:
+def handle_hdel(args: list[str]) -> RESPValue:
     # HDEL key field [field ...]
     if len(args) < 2:
         return _err("ERR wrong number of arguments for HDEL")
     key, *fields = args
-    async with _lock:
-        new_store, result = hash_del(_state_module._store, key, *fields)
-        _state_module._store = new_store
-    if isinstance(result, str):
-        return _err(result)
+    result = hash_del(_state_module._store, key, *fields)
     return result  # int
 
 
-async def handle_hexists(args: list[str]) -> RESPValue:
+def handle_hexists(args: list[str]) -> RESPValue:
     # HEXISTS key field
     if len(args) != 2:
         return _err("ERR wrong number of arguments for HEXISTS")
     result = hash_exists(_state_module._store, args[0], args[1])
-    if isinstance(result, str):
-        return _err(result)
     return result  # 0 or 1
 
 
-async def handle_hlen(args: list[str]) -> RESPValue:
+def handle_hlen(args: list[str]) -> RESPValue:
     if len(args) != 1:
         return _err("ERR wrong number of arguments for HLEN")
     result = hash_len(_state_module._store, args[0])
-    if isinstance(result, str):
-        return _err(result)
     return result
 
 
-async def handle_hstrlen(args: list[str]) -> RESPValue:
+def handle_hstrlen(args: list[str]) -> RESPValue:
     if len(args) != 2:
         return _err("ERR wrong number of arguments for HSTRLEN")
     result = hash_strlen(_state_module._store, args[0], args[1])
-    if isinstance(result, str):
-        return _err(result)
     return result
 
 
-async def handle_hkeys(args: list[str]) -> RESPValue:
+def handle_hkeys(args: list[str]) -> RESPValue:
     if len(args) != 1:
         return _err("ERR wrong number of arguments for HKEYS")
     result = hash_keys(_state_module._store, args[0])
-    if isinstance(result, str):
-        return _err(result)
     return _to_array(result)
 
 
-async def handle_hvals(args: list[str]) -> RESPValue:
+def handle_hvals(args: list[str]) -> RESPValue:
     if len(args) != 1:
         return _err("ERR wrong number of arguments for HVALS")
     result = hash_vals(_state_module._store, args[0])
-    if isinstance(result, str):
-        return _err(result)
     return _to_array(result)
 
 
-async def handle_hgetall(args: list[str]) -> RESPValue:
+def handle_hgetall(args: list[str]) -> RESPValue:
     if len(args) != 1:
         return _err("ERR wrong number of arguments for HGETALL")
     result = hash_getall(_state_module._store, args[0])
-    if isinstance(result, str):
-        return _err(result)
     return _to_array(result)
 
 
-async def handle_hincrby(args: list[str]) -> RESPValue:
+def handle_hincrby(args: list[str]) -> RESPValue:
     # HINCRBY key field increment
     if len(args) != 3:
         return _err("ERR wrong number of arguments for HINCRBY")
@@ -194,15 +152,11 @@ async def handle_hincrby(args: list[str]) -> RESPValue:
     except ValueError:
         return _err("ERR value is not an integer or out of range")
 
-    async with _lock:
-        new_store, result = hash_incrby(_state_module._store, key, field, increment)
-        _state_module._store = new_store
-    if isinstance(result, str):
-        return _err(result)
+    result = hash_incrby(_state_module._store, key, field, increment)
     return result  # int
 
 
-async def handle_hincrbyfloat(args: list[str]) -> RESPValue:
+def handle_hincrbyfloat(args: list[str]) -> RESPValue:
     # HINCRBYFLOAT key field increment
     if len(args) != 3:
         return _err("ERR wrong number of arguments for HINCRBYFLOAT")
@@ -212,15 +166,11 @@ async def handle_hincrbyfloat(args: list[str]) -> RESPValue:
     except ValueError:
         return _err("ERR value is not a valid float")
 
-    async with _lock:
-        new_store, result = hash_incrbyfloat(_state_module._store, key, field, increment)
-        _state_module._store = new_store
-    if isinstance(result, str):
-        return _err(result)
+    result = hash_incrbyfloat(_state_module._store, key, field, increment)
     return _bulk(result)  # Redis returns float as bulk string
 
 
-async def handle_hrandfield(args: list[str]) -> RESPValue:
+def handle_hrandfield(args: list[str]) -> RESPValue:
     # HRANDFIELD key [count [WITHVALUES]]
     if not args:
         return _err("ERR wrong number of arguments for HRANDFIELD")
@@ -239,8 +189,6 @@ async def handle_hrandfield(args: list[str]) -> RESPValue:
 
     result = hash_randfield(_state_module._store, key, count, with_values)
 
-    if isinstance(result, str) and result.startswith("WRONGTYPE"):
-        return _err(result)
     if result is None:
         return _bulk(None)
     if isinstance(result, list):
@@ -248,7 +196,7 @@ async def handle_hrandfield(args: list[str]) -> RESPValue:
     return _bulk(result)  # single field, no count given
 
 
-async def handle_hscan(args: list[str]) -> RESPValue:
+def handle_hscan(args: list[str]) -> RESPValue:
     # HSCAN key cursor [MATCH pattern] [COUNT count]
     if len(args) < 2:
         return _err("ERR wrong number of arguments for HSCAN")
@@ -258,6 +206,8 @@ async def handle_hscan(args: list[str]) -> RESPValue:
         cursor = int(args[1])
     except ValueError:
         return _err("ERR cursor is not an integer")
+    if cursor < 0:
+        return _err("ERR invalid cursor")
 
     match_pattern = "*"
     count = 10
@@ -272,13 +222,14 @@ async def handle_hscan(args: list[str]) -> RESPValue:
                 count = int(args[i + 1])
             except ValueError:
                 return _err("ERR COUNT is not an integer")
+            # Like Redis, a COUNT below 1 is a syntax error rather than "one"
+            if count < 1:
+                return _err("ERR syntax error")
             i += 2
         else:
             i += 1
 
     result = hash_scan(_state_module._store, key, cursor, match_pattern, count)
-    if isinstance(result, str):
-        return _err(result)
 
     next_cursor, flat = result
     return RESPArray(
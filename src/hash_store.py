@@ -1,168 +1,169 @@
 from __future__ import annotations
 
-import fnmatch
 import math
 import random
+from itertools import islice
 
-from store import StoreEntry, store_get
+from store import CommandError, Store, WrongTypeError, glob_matcher, store_delete, store_get, store_put
 
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
 
-def _wrong_type() -> str:
-    return "WRONGTYPE Operation against a key holding the wrong kind of value"
-
-
-def _get_hash(store: dict, key: str) -> dict | None | str:
+def _get_hash(store: Store, key: str) -> dict | None:
     """
-    Returns the inner hash dict, None if the key is absent, or an error
-    string if the key holds a non-hash value.
+    Returns the inner hash dict, or None if the key is absent.
+    Raises WrongTypeError if the key holds a non-hash value.
     """
-    entry = store_get(store, key)
-    if entry is None:
+    value = store_get(store, key)
+    if value is None:
         return None
-    if not isinstance(entry.value, dict):
-        return _wrong_type()
-    return entry.value
+    if not isinstance(value, dict):
+        raise WrongTypeError()
+    return value
+
+
+def _field_str(value: str | int) -> str:
+    """HINCRBY keeps counters as ints; render them as strings on the way out."""
+    return value if type(value) is str else str(value)
 
 
-def _put_hash(store: dict, key: str, inner: dict) -> dict:
-    """Write (or overwrite) a hash entry, preserving existing TTL."""
-    existing = store.get(key)
-    expires_at = existing.expires_at if existing else None
-    return {**store, key: StoreEntry(inner, expires_at)}
+def _put_hash(store: Store, key: str, inner: dict) -> None:
+    """Write (or overwrite) a hash entry in place; its TTL lives in store.expires and is kept."""
+    store_put(store, key, inner)
 
 
 # ---------------------------------------------------------------------------
-# Write operations  →  return (new_store, result)
+# Write operations  →  mutate the store in place, return result
+#
+# None of these await, so on the single-threaded event loop each command is
+# applied atomically without a lock.
 # ---------------------------------------------------------------------------
 
 
 def hash_set(
-    store: dict,
+    store: Store,
     key: str,
     field_value_pairs: list[tuple[str, str]],
-) -> tuple[dict, int | str]:
+) -> int:
     """
     HSET key field value [field value ...]
     Returns number of *new* fields added (updates don't count).
     """
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return store, inner
-    inner = dict(inner) if inner else {}
+    if inner is None:
+        inner = {}
 
     added = sum(1 for f, _ in field_value_pairs if f not in inner)
     for field, value in field_value_pairs:
         inner[field] = value
 
-    return _put_hash(store, key, inner), added
+    _put_hash(store, key, inner)
+    return added
 
 
 def hash_setnx(
-    store: dict,
+    store: Store,
     key: str,
     field: str,
     value: str,
-) -> tuple[dict, int | str]:
+) -> int:
     """
     HSETNX key field value
     Sets field only if it does not exist. Returns 1 if set, 0 otherwise.
     """
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return store, inner
-    inner = dict(inner) if inner else {}
+    if inner is None:
+        inner = {}
 
     if field in inner:
-        return store, 0
+        return 0
     inner[field] = value
-    return _put_hash(store, key, inner), 1
+    _put_hash(store, key, inner)
+    return 1
 
 
 def hash_del(
-    store: dict,
+    store: Store,
     key: str,
     *fields: str,
-) -> tuple[dict, int | str]:
+) -> int:
     """
     HDEL key field [field ...]
     Returns number of fields actually deleted.
     """
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return store, inner
     if inner is None:
-        return store, 0
+        return 0
 
-    inner = dict(inner)
-    deleted = sum(1 for f in fields if f in inner)
+    deleted = 0
     for f in fields:
-        inner.pop(f, None)
+        if f in inner:
+            del inner[f]
+            deleted += 1
 
     # If hash is now empty, remove the key entirely
     if not inner:
-        new_store = {k: v for k, v in store.items() if k != key}
-        return new_store, deleted
+        store_delete(store, key)
 
-    return _put_hash(store, key, inner), deleted
+    return deleted
 
 
 def hash_incrby(
-    store: dict,
+    store: Store,
     key: str,
     field: str,
     increment: int,
-) -> tuple[dict, int | str]:
+) -> int:
     """
     HINCRBY key field increment
     Increments the integer value of a field.
     """
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return store, inner
-    inner = dict(inner) if inner else {}
+    if inner is None:
+        inner = {}
 
-    current = inner.get(field, "0")
+    # Counters are stored as int so repeated increments skip the str round-trip
+    current = inner.get(field, 0)
     try:
         new_val = int(current) + increment
     except ValueError:
-        return store, "ERR hash value is not an integer"
+        raise CommandError("ERR hash value is not an integer")
 
-    inner[field] = str(new_val)
-    return _put_hash(store, key, inner), new_val
+    inner[field] = new_val
+    _put_hash(store, key, inner)
+    return new_val
 
 
 def hash_incrbyfloat(
-    store: dict,
+    store: Store,
     key: str,
     field: str,
     increment: float,
-) -> tuple[dict, float | str]:
+) -> str:
     """
     HINCRBYFLOAT key field increment
     Increments the float value of a field.
     """
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return store, inner
-    inner = dict(inner) if inner else {}
+    if inner is None:
+        inner = {}
 
-    current = inner.get(field, "0")
+    current = inner.get(field, 0)
     try:
         new_val = float(current) + increment
     except ValueError:
-        return store, "ERR hash value is not a float"
+        raise CommandError("ERR hash value is not a float")
 
     if math.isnan(new_val) or math.isinf(new_val):
-        return store, "ERR increment would produce NaN or Infinity"
+        raise CommandError("ERR increment would produce NaN or Infinity")
 
     # Redis trims unnecessary trailing zeros
     formatted = f"{new_val:.17g}"
     inner[field] = formatted
-    return _put_hash(store, key, inner), formatted
+    _put_hash(store, key, inner)
+    return formatted
 
 
 # ---------------------------------------------------------------------------
@@ -170,86 +171,73 @@ def hash_incrbyfloat(
 # ---------------------------------------------------------------------------
 
 
-def hash_get(store: dict, key: str, field: str) -> str | None:
+def hash_get(store: Store, key: str, field: str) -> str | None:
     """HGET key field — returns value or None."""
     inner = _get_hash(store, key)
-    if inner is None or isinstance(inner, str):
-        return inner  # None or error string
-    return inner.get(field)
+    if inner is None:
+        return None
+    value = inner.get(field)
+    return _field_str(value) if value is not None else None
 
 
-def hash_mget(store: dict, key: str, *fields: str) -> list[str | None] | str:
+def hash_mget(store: Store, key: str, *fields: str) -> list[str | None]:
     """HMGET key field [field ...] — returns list with None for missing fields."""
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return inner
     if inner is None:
-        return [None] * len(fields)  # type: ignore
-    return [inner.get(f) for f in fields]
+        return [None] * len(fields)
+    return [_field_str(inner[f]) if f in inner else None for f in fields]
 
 
-def hash_exists(store: dict, key: str, field: str) -> int | str:
+def hash_exists(store: Store, key: str, field: str) -> int:
     """HEXISTS key field — 1 if field exists, 0 otherwise."""
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return inner
     if inner is None:
         return 0
     return 1 if field in inner else 0
 
 
-def hash_len(store: dict, key: str) -> int | str:
+def hash_len(store: Store, key: str) -> int:
     """HLEN key — number of fields."""
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return inner
     return len(inner) if inner else 0
 
 
-def hash_strlen(store: dict, key: str, field: str) -> int | str:
+def hash_strlen(store: Store, key: str, field: str) -> int:
     """HSTRLEN key field — length of field value string."""
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return inner
     if inner is None:
         return 0
-    return len(inner.get(field, ""))
+    return len(_field_str(inner.get(field, "")))
 
 
-def hash_keys(store: dict, key: str) -> list[str] | str:
+def hash_keys(store: Store, key: str) -> list[str]:
     """HKEYS key — list of all field names."""
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return inner
     return list(inner.keys()) if inner else []
 
 
-def hash_vals(store: dict, key: str) -> list[str] | str:
+def hash_vals(store: Store, key: str) -> list[str]:
     """HVALS key — list of all values."""
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return inner
-    return list(inner.values()) if inner else []
+    return [_field_str(v) for v in inner.values()] if inner else []
 
 
-def hash_getall(store: dict, key: str) -> list[str] | str:
+def hash_getall(store: Store, key: str) -> list[str]:
     """
     HGETALL key — flat list alternating field, value (Redis wire format).
     """
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return inner
     if not inner:
         return []
     result = []
     for f, v in inner.items():
         result.append(f)
-        result.append(v)
+        result.append(_field_str(v))
     return result
 
 
 def hash_randfield(
-    store: dict,
+    store: Store,
     key: str,
     count: int | None = None,
     with_values: bool = False,
@@ -261,8 +249,6 @@ def hash_randfield(
     - Negative count: exactly |count| fields, allowing repeats.
     """
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return inner
     if not inner:
         return None if count is None else []
 
@@ -281,40 +267,44 @@ def hash_randfield(
     result = []
     for f in chosen:
         result.append(f)
-        result.append(inner[f])
+        result.append(_field_str(inner[f]))
     return result
 
 
 def hash_scan(
-    store: dict,
+    store: Store,
     key: str,
     cursor: int,
     match: str = "*",
     count: int = 10,
-) -> tuple[int, list[str]] | str:
+) -> tuple[int, list[str]]:
     """
     HSCAN key cursor [MATCH pattern] [COUNT count]
-    Simplified full-scan implementation (cursor is always 0 on completion).
+    The cursor is an offset into the hash's insertion order (cursor is 0 on
+    completion); each call stops after `count` matching fields.
     Returns (next_cursor, [field, value, ...]).
     """
     inner = _get_hash(store, key)
-    if isinstance(inner, str):
-        return inner
     if not inner:
         return 0, []
 
-    all_items = [(f, v) for f, v in inner.items() if fnmatch.fnmatch(f, match)]
-
-    # Simple stateless scan: cursor 0 starts, we page by `count`, return 0
-    # when done.  For a real implementation use cursor as an offset index.
-    start = cursor
-    end = start + count
-    page = all_items[start:end]
-    next_cursor = end if end < len(all_items) else 0
+    matcher = glob_matcher(match)
 
+    # Walk lazily from the cursor so a page costs O(cursor + scanned) instead
+    # of filtering and materialising the whole hash on every call.
     flat = []
-    for f, v in page:
-        flat.append(f)
-        flat.append(v)
+    found = 0
+    next_cursor = cursor
+    for f, v in islice(inner.items(), cursor, None):
+        next_cursor += 1
+        if matcher(f):
+            flat.append(f)
+            flat.append(_field_str(v))
+            found += 1
+            if found >= count:
+                break
+
+    if next_cursor >= len(inner):
+        next_cursor = 0
 
     return next_cursor, flat
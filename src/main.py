@@ -4,10 +4,16 @@ import os
 
 from server import start_server
 
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - uvloop is an optional libuv-backed event loop
+    uvloop = None
+
 logging.basicConfig(level=logging.INFO)
 
 if __name__ == "__main__":
     host = os.getenv("CACHE_HOST", "0.0.0.0")
     port = int(os.getenv("CACHE_PORT", "6379"))
 
-    asyncio.run(start_server(host, port))
+    run = uvloop.run if uvloop is not None else asyncio.run
+    run(start_server(host, port))
@@ -3,118 +3,426 @@ from __future__ import annotations
 from dataclasses import dataclass
 from typing import Any, Optional
 
+try:
+    import hiredis
+except ImportError:  # pragma: no cover - only when installed without the Pipfile
+    hiredis = None
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class SimpleString:
     value: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class BulkString:
     value: Optional[str]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RESPArray:
     items: tuple[Any, ...]
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
+class BulkStringArray:
+    """
+    Array whose elements are all bulk strings (None for nil).  Handlers use
+    it for list replies so each element needs no BulkString wrapper.
+    """
+
+    items: tuple[Optional[str], ...]
+
+
+@dataclass(frozen=True, slots=True)
 class RESPError:
     message: str
 
 
-RESPValue = SimpleString | BulkString | RESPArray | RESPError | int
+RESPValue = SimpleString | BulkString | RESPArray | BulkStringArray | RESPError | int
+
+# Shared instances for the most frequent replies.  serialize() recognises
+# them by identity and returns their pre-encoded bytes.
+OK = SimpleString("OK")
+PONG = SimpleString("PONG")
+NIL = BulkString(None)
+EMPTY_ARRAY = BulkStringArray(())
+
+_OK_BYTES = b"+OK\r\n"
+_PONG_BYTES = b"+PONG\r\n"
+_NIL_BYTES = b"$-1\r\n"
+_EMPTY_ARRAY_BYTES = b"*0\r\n"
+
+# Counts, flags and lengths are almost always small; pre-encode those replies
+_INT_BYTES = {n: b":%d\r\n" % n for n in range(-2, 1025)}
+
+# Bulk string headers ("$<len>\r\n") for payloads shorter than 4 KiB
+_BULK_HEADER_LIMIT = 4096
+_BULK_HEADERS = [b"$%d\r\n" % n for n in range(_BULK_HEADER_LIMIT)]
 
 
 def parse(data: bytes) -> tuple[RESPValue, bytes]:
-    if not data:
+    value, pos = parse_at(data, 0)
+    return value, data[pos:]
+
+
+def parse_at(data: bytes | bytearray, pos: int) -> tuple[RESPValue, int]:
+    """
+    Parse one value starting at ``data[pos]`` and return it together with the
+    offset just past it.  Works on offsets throughout, so no intermediate
+    slices of the remaining buffer are made.
+    """
+    if pos >= len(data):
         raise ValueError("Empty buffer")
 
-    prefix, rest = chr(data[0]), data[1:]
-
-    match prefix:
-        case "+":
-            return _parse_simple_string(rest)
-        case "-":
-            return _parse_error(rest)
-        case ":":
-            return _parse_integer(rest)
-        case "$":
-            return _parse_bulk_string(rest)
-        case "*":
-            return _parse_array(rest)
-        case _:
-            raise ValueError(f"Unknown RESP prefix: {prefix!r}")
+    prefix, pos = data[pos], pos + 1
+    if prefix == _ARRAY_PREFIX:
+        return _parse_array(data, pos)
+
+    leaf_parser = _LEAF_PARSERS.get(prefix)
+    if leaf_parser is None:
+        raise ValueError(f"Unknown RESP prefix: {chr(prefix)!r}")
+    return leaf_parser(data, pos)
 
 
-def _read_line(data: bytes) -> tuple[bytes, bytes]:
-    idx = data.find(b"\r\n")
+def _read_line(data: bytes, pos: int) -> tuple[bytes, int]:
+    idx = data.find(b"\r\n", pos)
 
     if idx == -1:
         raise ValueError("Incomplete: no CRLF found")
 
-    return data[:idx], data[idx + 2 :]
+    return data[pos:idx], idx + 2
 
 
-def _parse_simple_string(data: bytes) -> tuple[SimpleString, bytes]:
-    line, rest = _read_line(data)
-    return SimpleString(line.decode()), rest
+def _parse_simple_string(data: bytes, pos: int) -> tuple[SimpleString, int]:
+    line, pos = _read_line(data, pos)
+    return SimpleString(line.decode()), pos
 
 
-def _parse_error(data: bytes) -> tuple[RESPError, bytes]:
-    line, rest = _read_line(data)
-    return RESPError(line.decode()), rest
+def _parse_error(data: bytes, pos: int) -> tuple[RESPError, int]:
+    line, pos = _read_line(data, pos)
+    return RESPError(line.decode()), pos
 
 
-def _parse_integer(data: bytes) -> tuple[int, bytes]:
-    line, rest = _read_line(data)
-    return int(line), rest
+def _parse_integer(data: bytes, pos: int) -> tuple[int, int]:
+    line, pos = _read_line(data, pos)
+    return int(line), pos
 
 
-def _parse_bulk_string(data: bytes) -> tuple[BulkString, bytes]:
-    length_line, rest = _read_line(data)
+def _parse_bulk_string(data: bytes, pos: int) -> tuple[BulkString, int]:
+    length_line, pos = _read_line(data, pos)
     length = int(length_line)
 
     if length == -1:
-        return BulkString(None), rest
+        return BulkString(None), pos
 
-    if len(rest) < length + 2:
+    end = pos + length
+    if len(data) < end + 2:
         raise ValueError("Incomplete bulk string")
 
-    return BulkString(rest[:length].decode()), rest[length + 2 :]
+    return BulkString(data[pos:end].decode()), end + 2
 
 
-def _parse_array(data: bytes) -> tuple[RESPArray, bytes]:
-    count_line, rest = _read_line(data)
+def _parse_array(data: bytes, pos: int) -> tuple[RESPArray, int]:
+    """
+    Parse an array without recursing through parse_at() for every element.
+    Nested arrays push an (items, count) frame onto an explicit stack, so a
+    wide or deep payload is decoded in a single Python frame.
+    """
+    count_line, pos = _read_line(data, pos)
     count = int(count_line)
 
-    if count == -1:
-        return RESPArray(tuple()), rest
-
-    items = []
-    for _ in range(count):
-        item, rest = parse(rest)
+    if count <= 0:
+        return RESPArray(tuple()), pos
+
+    flat = _parse_flat_bulk_array(data, pos, count)
+    if flat is not None:
+        return flat
+
+    size = len(data)
+    stack: list[tuple[list, int]] = [([], count)]
+    while True:
+        items, count = stack[-1]
+        if len(items) == count:
+            stack.pop()
+            array = RESPArray(tuple(items))
+            if not stack:
+                return array, pos
+            stack[-1][0].append(array)
+            continue
+
+        if pos >= size:
+            raise ValueError("Incomplete array")
+
+        prefix, pos = data[pos], pos + 1
+        if prefix == _ARRAY_PREFIX:
+            count_line, pos = _read_line(data, pos)
+            nested_count = int(count_line)
+            if nested_count <= 0:
+                items.append(RESPArray(tuple()))
+            else:
+                stack.append(([], nested_count))
+            continue
+
+        leaf_parser = _LEAF_PARSERS.get(prefix)
+        if leaf_parser is None:
+            raise ValueError(f"Unknown RESP prefix: {chr(prefix)!r}")
+        item, pos = leaf_parser(data, pos)
         items.append(item)
 
-    return RESPArray(tuple(items)), rest
+
+def _parse_flat_bulk_array(data: bytes, pos: int, count: int) -> tuple[RESPArray, int] | None:
+    """
+    Fast path for the shape every client command has: an array of non-nil
+    bulk strings.  Element boundaries are located by offset first, then an
+    all-ASCII frame is decoded with one call and sliced, instead of decoding
+    each argument separately.  Returns None for any other shape.
+    """
+    spans = []
+    begin = pos
+    for _ in range(count):
+        if data[pos : pos + 1] != b"$":
+            return None
+        idx = data.find(b"\r\n", pos)
+        if idx == -1:
+            raise ValueError("Incomplete: no CRLF found")
+        length = int(data[pos + 1 : idx])
+        if length < 0:
+            return None
+        start = idx + 2
+        pos = start + length + 2
+        if len(data) < pos:
+            raise ValueError("Incomplete bulk string")
+        spans.append((start - begin, start - begin + length))
+
+    frame = data[begin:pos]
+    if frame.isascii():
+        text = frame.decode("ascii")
+        items = tuple(BulkString(text[a:b]) for a, b in spans)
+    else:
+        items = tuple(BulkString(frame[a:b].decode()) for a, b in spans)
+    return RESPArray(items), pos
+
+
+_ARRAY_PREFIX = ord("*")
+_BULK_PREFIX = ord("$")
+_LEAF_PARSERS = {
+    ord("+"): _parse_simple_string,
+    ord("-"): _parse_error,
+    ord(":"): _parse_integer,
+    ord("$"): _parse_bulk_string,
+}
+
+
+class PythonParser:
+    """
+    Incremental RESP reader built on ``parse_at``.
+    Feed raw bytes as they arrive, then call ``gets`` until it returns False.
+
+    Consumed input is tracked with a read offset and only trimmed from the
+    buffer once it is fully drained or the offset passes ``_COMPACT_AT``.
+    ``gets_command`` also keeps the arguments of a partially received
+    command, so a large pipeline split across reads is not re-scanned.
+    """
+
+    _COMPACT_AT = 64 * 1024
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+        self._pos = 0
+        # In-progress command: arguments so far and elements still to read
+        self._argv: list[str] | None = None
+        self._remaining = 0
+
+    def feed(self, data: bytes) -> None:
+        self._buf.extend(data)
+
+    def _consume(self, pos: int) -> None:
+        if pos == len(self._buf):
+            self._buf.clear()
+            pos = 0
+        elif pos > self._COMPACT_AT:
+            del self._buf[:pos]
+            pos = 0
+        self._pos = pos
+
+    def gets(self) -> RESPValue | bool:
+        """Returns the next complete value, or False if more data is needed."""
+        if self._pos >= len(self._buf):
+            return False
+        try:
+            value, pos = parse_at(self._buf, self._pos)
+        except ValueError:
+            return False
+        self._consume(pos)
+        return value
+
+    def gets_command(self) -> list[str] | None | bool:
+        """
+        Returns the next command as its string arguments, None if the frame
+        is not an array, or False if more data is needed.
+        """
+        buf = self._buf
+        pos = self._pos
+        size = len(buf)
+        argv = self._argv
+
+        if argv is None:
+            if pos >= size:
+                return False
+            if buf[pos] != _ARRAY_PREFIX:
+                return False if self.gets() is False else None
+            idx = buf.find(b"\r\n", pos)
+            if idx == -1:
+                return False
+            remaining = int(buf[pos + 1 : idx])
+            pos = idx + 2
+            if remaining <= 0:
+                self._consume(pos)
+                return []
+            argv = []
+        else:
+            remaining = self._remaining
+
+        while remaining:
+            if pos >= size:
+                break
+            if buf[pos] == _BULK_PREFIX:
+                idx = buf.find(b"\r\n", pos)
+                if idx == -1:
+                    break
+                length = int(buf[pos + 1 : idx])
+                if length < 0:
+                    # Nil elements carry no argument
+                    pos = idx + 2
+                else:
+                    end = idx + 2 + length
+                    if size < end + 2:
+                        break
+                    argv.append(buf[idx + 2 : end].decode())
+                    pos = end + 2
+            else:
+                # Integers, nested arrays and the like are skipped
+                try:
+                    _, pos = parse_at(buf, pos)
+                except ValueError:
+                    break
+            remaining -= 1
+
+        if remaining:
+            self._argv = argv
+            self._remaining = remaining
+            self._pos = pos
+            return False
+
+        self._argv = None
+        self._consume(pos)
+        return argv
+
+
+class HiredisParser:
+    """
+    Same interface as ``PythonParser`` but backed by ``hiredis.Reader``, which
+    keeps its own buffer and decodes frames in C.  Native replies are converted
+    to RESP dataclasses only at the boundary, and commands skip that step.
+    """
+
+    def __init__(self) -> None:
+        self._reader = hiredis.Reader(encoding="utf-8")
+
+    def feed(self, data: bytes) -> None:
+        self._reader.feed(data)
+
+    def gets(self) -> RESPValue | bool:
+        value = self._reader.gets()
+        if value is False:
+            return False
+        return _from_hiredis(value)
+
+    def gets_command(self) -> list[str] | None | bool:
+        value = self._reader.gets()
+        if value is False:
+            return False
+        if type(value) is not list:
+            return None
+        # Keep the native strings; nil, integer and nested elements are dropped
+        return [v for v in value if type(v) is str]
+
+
+def _from_hiredis(value: Any) -> RESPValue:
+    # hiredis returns simple and bulk strings alike as str, and nil as None
+    if isinstance(value, list):
+        return RESPArray(tuple(_from_hiredis(v) for v in value))
+    if isinstance(value, hiredis.ReplyError):
+        return RESPError(str(value))
+    if value is None or isinstance(value, str):
+        return BulkString(value)
+    return value
+
+
+Parser = HiredisParser if hiredis is not None else PythonParser
 
 
 def serialize(value: RESPValue) -> bytes:
+    if value is OK:
+        return _OK_BYTES
+    if value is PONG:
+        return _PONG_BYTES
+    if value is NIL:
+        return _NIL_BYTES
+    if value is EMPTY_ARRAY:
+        return _EMPTY_ARRAY_BYTES
+    if type(value) is int:
+        return _INT_BYTES.get(value) or b":%d\r\n" % value
+
     match value:
         case SimpleString(v):
             return f"+{v}\r\n".encode()
         case RESPError(msg):
             return f"-{msg}\r\n".encode()
-        case int(n):
-            return f":{n}\r\n".encode()
+        case bool(b):
+            return b":1\r\n" if b else b":0\r\n"
         case BulkString(None):
-            return b"$-1\r\n"
+            return _NIL_BYTES
         case BulkString(v):
-            return f"${len(v)}\r\n{v}\r\n".encode()  # type: ignore
-        case RESPArray(items):
-            parts = [f"*{len(items)}\r\n".encode()]
-            parts += [serialize(i) for i in items]
-            return b"".join(parts)
+            # RESP lengths count bytes, not code points
+            encoded = v.encode()  # type: ignore
+            n = len(encoded)
+            header = _BULK_HEADERS[n] if n < _BULK_HEADER_LIMIT else b"$%d\r\n" % n
+            return b"".join((header, encoded, b"\r\n"))
+        case BulkStringArray(items) if hiredis is not None and None not in items:
+            # No nils: hiredis encodes the whole array in C
+            return hiredis.pack_command(items)
+        case RESPArray() | BulkStringArray():
+            buf = bytearray()
+            _serialize_into(buf, value)
+            return bytes(buf)
         case _:
             raise TypeError(f"Cannot serialize {type(value)}")
+
+
+def _serialize_into(buf: bytearray, value: RESPValue) -> None:
+    """Append the encoding of `value` to `buf`, writing arrays element by element."""
+    if isinstance(value, RESPArray):
+        buf += b"*%d\r\n" % len(value.items)
+        for item in value.items:
+            _serialize_into(buf, item)
+    elif isinstance(value, BulkStringArray):
+        buf += b"*%d\r\n" % len(value.items)
+        for s in value.items:
+            if s is None:
+                buf += _NIL_BYTES
+            else:
+                _bulk_into(buf, s)
+    elif isinstance(value, BulkString) and value.value is not None:
+        _bulk_into(buf, value.value)
+    else:
+        buf += serialize(value)
+
+
+def _bulk_into(buf: bytearray, s: str) -> None:
+    encoded = s.encode()
+    n = len(encoded)
+    buf += _BULK_HEADERS[n] if n < _BULK_HEADER_LIMIT else b"$%d\r\n" % n
+    buf += encoded
+    buf += b"\r\n"
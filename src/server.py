@@ -2,45 +2,115 @@ from __future__ import annotations
 
 import asyncio
 import logging
+from typing import Iterator
 
 from commands import dispatch
-from protocol import BulkString, RESPArray, RESPError, parse, serialize
+from protocol import Parser, RESPError, serialize
 
 log = logging.getLogger(__name__)
 
+# One read picks up a whole pipelined batch rather than 4 KiB slices of it
+_READ_SIZE = 64 * 1024
+
+# Replies to a pipelined batch are buffered and handed to the transport in one
+# writelines() call (a gather write, no join); a batch that grows past this
+# many bytes is flushed early to bound memory.
+_FLUSH_THRESHOLD = 64 * 1024
+
+_ERR_EXPECTED_ARRAY = serialize(RESPError("ERR expected array"))
+
+
+def _reply_batches(parser: Parser) -> Iterator[list[bytes]]:
+    """Execute every complete command in `parser`, yielding replies in batches."""
+    replies: list[bytes] = []
+    pending = 0
+    while (args := parser.gets_command()) is not False:
+        if args is None:
+            reply = _ERR_EXPECTED_ARRAY
+        else:
+            # A failing command must not discard the replies already buffered
+            # for earlier commands in the batch: those commands have run.
+            try:
+                reply = serialize(dispatch(args))
+            except Exception as e:
+                log.error("Command %r failed: %s", args[0], e)
+                reply = serialize(RESPError(f"ERR {e}"))
+        replies.append(reply)
+        pending += len(reply)
+        if pending >= _FLUSH_THRESHOLD:
+            yield replies
+            replies = []
+            pending = 0
+
+    if replies:
+        yield replies
+
+
+class RedisProtocol(asyncio.Protocol):
+    """
+    Callback-based connection handler used by ``start_server``.  Each chunk is
+    parsed and executed synchronously inside ``data_received`` and replies go
+    straight to ``transport.writelines``, with no await per read or drain.
+    """
+
+    def __init__(self) -> None:
+        self._parser = Parser()
+        self._transport: asyncio.Transport | None = None
+        self._addr = None
+
+    def connection_made(self, transport: asyncio.Transport) -> None:  # type: ignore[override]
+        self._transport = transport
+        self._addr = transport.get_extra_info("peername")
+        log.info("New connection from %s", self._addr)
+
+    def data_received(self, data: bytes) -> None:
+        transport = self._transport
+        self._parser.feed(data)
+        try:
+            for replies in _reply_batches(self._parser):
+                transport.writelines(replies)
+        except Exception as e:
+            # Command failures are answered in-band; only a malformed stream
+            # the parser cannot resynchronise on ends the connection.
+            log.error("Client error: %s", e)
+            transport.close()
+
+    # Stop reading while the peer is not consuming replies
+    def pause_writing(self) -> None:
+        self._transport.pause_reading()
+
+    def resume_writing(self) -> None:
+        self._transport.resume_reading()
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        log.info("Connection closed: %s", self._addr)
+
 
 async def handle_client(
     reader: asyncio.StreamReader,
     writer: asyncio.StreamWriter,
 ) -> None:
+    """Stream-based adapter over the same execution path as ``RedisProtocol``."""
     addr = writer.get_extra_info("peername")
     log.info("New connection from %s", addr)
 
-    buf = b""
+    parser = Parser()
+    # Bound once: the loop below runs per read and per batch
+    read = reader.read
+    feed = parser.feed
+    writelines = writer.writelines
+    drain = writer.drain
 
     try:
         while True:
-            chunk = await reader.read(4096)
+            chunk = await read(_READ_SIZE)
             if not chunk:
                 break
 
-            buf += chunk
-
-            while buf:
-                try:
-                    value, buf = parse(buf)
-                except ValueError:
-                    break
-
-                if not isinstance(value, RESPArray):
-                    writer.write(serialize(RESPError("ERR expected array")))
-                    continue
-
-                args = [item.value for item in value.items if isinstance(item, BulkString) and item.value is not None]
-                result = await dispatch(args)
-                writer.write(serialize(result))
-
-                await writer.drain()
+            feed(chunk)
+            for replies in _reply_batches(parser):
+                writelines(replies)
+                await drain()
     except Exception as e:
         log.error("Client error: %s", e)
     finally:
@@ -49,7 +119,8 @@ async def handle_client(
 
 
 async def start_server(host: str = "0.0.0.0", port: int = 6379) -> None:
-    server = await asyncio.start_server(handle_client, host, port)
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(RedisProtocol, host, port)
     log.info("Cache server listening on %s:%d", host, port)
 
     async with server:
@@ -1,6 +1,6 @@
-import asyncio
+from store import Store, make_store
 
-from store import make_store
-
-_store: dict = make_store()
-_lock: asyncio.Lock = asyncio.Lock()
+# Shared keyspace.  Command handlers are plain functions called from the
+# event loop thread, so each command runs to completion before the next one
+# starts and is atomic without locks.
+_store: Store = make_store()
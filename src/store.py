@@ -1,67 +1,252 @@
 from __future__ import annotations
 
+import bisect
+import fnmatch
+import functools
+import heapq
+import re
+import sys
 import time
-from typing import Any, NamedTuple, Optional
+from itertools import takewhile
+from typing import Any, Callable, Optional
 
 
-class StoreEntry(NamedTuple):
-    value: Any
-    expires_at: Optional[float]
+class _BisectList(list):
+    """
+    List-backed stand-in for ``sortedcontainers.SortedList`` covering the
+    subset of its API used by the key index and zsets.  Inserts and removals
+    shift elements, so they are O(n); sortedcontainers (declared in the
+    Pipfile) gives O(log n) and is what a normal install uses.
+    """
 
+    def __init__(self, iterable=()) -> None:
+        super().__init__(sorted(iterable))
 
-def make_store() -> dict[str, StoreEntry]:
-    return {}
+    def add(self, value) -> None:
+        bisect.insort(self, value)
 
+    def remove(self, value) -> None:
+        del self[self.index(value)]
 
-def store_get(store: dict, key: str) -> Optional[StoreEntry]:
-    entry = store.get(key)
+    def index(self, value) -> int:
+        idx = bisect.bisect_left(self, value)
+        if idx == len(self) or self[idx] != value:
+            raise ValueError(f"{value!r} not in list")
+        return idx
 
-    if entry is None:
-        return None
+    def bisect_left(self, value) -> int:
+        return bisect.bisect_left(self, value)
 
-    if entry.expires_at is not None and time.time() > entry.expires_at:
-        return None
+    def bisect_right(self, value) -> int:
+        return bisect.bisect_right(self, value)
 
-    return entry
+    def islice(self, start=None, stop=None, reverse=False):
+        indices = range(*slice(start, stop).indices(len(self)))
+        return map(self.__getitem__, reversed(indices) if reverse else indices)
 
 
-def store_set(
-    store: dict,
-    key: str,
-    value: Any,
-    ttl_seconds: Optional[float] = None,
-) -> dict:
-    expires_at = (time.time() + ttl_seconds) if ttl_seconds is not None else None
-    return {**store, key: StoreEntry(value, expires_at)}
+try:
+    from sortedcontainers import SortedList
+except ImportError:  # pragma: no cover - only when installed without the Pipfile
+    SortedList = _BisectList
+
+
+class CommandError(Exception):
+    """Raised by store operations; the message is sent back as a RESP error."""
+
+
+class WrongTypeError(CommandError):
+    def __init__(self) -> None:
+        super().__init__("WRONGTYPE Operation against a key holding the wrong kind of value")
+
+
+class Store:
+    """
+    Keyspace kept as two parallel dicts (struct-of-arrays):
+      values      : dict[key, value]
+      expires     : dict[key, expires_at] — only keys that carry a TTL, as
+                    integer milliseconds on the store clock
+      expire_heap : min-heap of (expires_at, key) used to find expired keys
+      sorted_keys : SortedList of every key, so globs with a literal prefix
+                    only visit the matching range
+      clock       : returns the current time in seconds; expiries are
+                    measured against it (time.monotonic by default)
+
+    Keys without a TTL never touch ``expires``.  Expired keys are removed by
+    ``_sweep``, which pops only the heap entries that are already due, so
+    reads never have to compare the clock against each entry they touch.
+    """
 
+    __slots__ = ("values", "expires", "expire_heap", "sorted_keys", "clock")
 
-def store_delete(store: dict, *keys: str) -> tuple[dict, int]:
-    deleted = sum(1 for k in keys if k in store)
-    new_store = {k: v for k, v in store.items() if k not in keys}
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.values: dict[str, Any] = {}
+        self.expires: dict[str, int] = {}
+        self.expire_heap: list[tuple[int, str]] = []
+        self.sorted_keys: SortedList = SortedList()
+        self.clock = clock
 
-    return new_store, deleted
 
+def make_store(clock: Callable[[], float] = time.monotonic) -> Store:
+    return Store(clock)
 
-def store_exists(store: dict, *keys: str) -> int:
-    return sum(1 for k in keys if store_get(store, k) is not None)
 
+def _now_ms(store: Store) -> int:
+    return int(store.clock() * 1000)
 
-def store_keys(store: dict, pattern: str = "*") -> list[str]:
-    import fnmatch
 
-    now = time.time()
+def _sweep(store: Store, now: int) -> None:
+    """
+    Remove every key whose TTL has passed.  Heap entries whose TTL was since
+    overwritten, cleared or deleted no longer match ``expires`` and are
+    discarded as they surface.  Readers check ``expire_heap`` before calling
+    so a store without TTLs never reads the clock.
+    """
+    heap = store.expire_heap
+    if not heap or heap[0][0] >= now:
+        return
 
-    return [k for k, e in store.items() if fnmatch.fnmatch(k, pattern) and (e.expires_at is None or e.expires_at > now)]
+    values, expires = store.values, store.expires
+    while heap and heap[0][0] < now:
+        expires_at, key = heapq.heappop(heap)
+        if expires.get(key) == expires_at:
+            del expires[key]
+            del values[key]
+            store.sorted_keys.remove(key)
 
 
-def store_ttl(store: dict, key: str) -> int:
-    entry = store.get(key)
+def store_get(store: Store, key: str) -> Any:
+    """Returns the value of a live key, else None."""
+    if store.expire_heap:
+        _sweep(store, _now_ms(store))
 
-    if entry is None:
+    return store.values.get(key)
+
+
+def store_mget(store: Store, keys: list[str]) -> list[Any]:
+    """Values for `keys` in order (None where missing), with one clock read and sweep."""
+    if store.expire_heap:
+        _sweep(store, _now_ms(store))
+    get = store.values.get
+    return [get(k) for k in keys]
+
+
+# Short string values (flags, statuses, small numbers) repeat across keys;
+# interning keeps one copy of each.
+_INTERN_MAX_LEN = 64
+
+
+def store_set(
+    store: Store,
+    key: str,
+    value: Any,
+    ttl_seconds: Optional[float] = None,
+) -> Store:
+    if type(value) is str and len(value) <= _INTERN_MAX_LEN:
+        value = sys.intern(value)
+    store_put(store, key, value)
+    if ttl_seconds is not None:
+        expires_at = _now_ms(store) + round(ttl_seconds * 1000)
+        store.expires[key] = expires_at
+        heap = store.expire_heap
+        heapq.heappush(heap, (expires_at, key))
+        # Overwritten TTLs leave stale heap entries behind; rebuild once
+        # they clearly outnumber the live ones.
+        if len(heap) > 2 * len(store.expires) + 64:
+            heap[:] = [(t, k) for k, t in store.expires.items()]
+            heapq.heapify(heap)
+    else:
+        store.expires.pop(key, None)
+    return store
+
+
+def store_put(store: Store, key: str, value: Any) -> None:
+    """Write `value` under `key`, keeping the key's TTL if it has one."""
+    values = store.values
+    if key not in values:
+        store.sorted_keys.add(key)
+    values[key] = value
+
+
+def store_delete(store: Store, *keys: str) -> tuple[Store, int]:
+    values, expires = store.values, store.expires
+    deleted = 0
+    for k in keys:
+        if values.pop(k, None) is not None:
+            expires.pop(k, None)
+            store.sorted_keys.remove(k)
+            deleted += 1
+
+    return store, deleted
+
+
+def store_exists(store: Store, *keys: str) -> int:
+    if store.expire_heap:
+        _sweep(store, _now_ms(store))
+    # Count in C; keys repeated in the call are counted each time, like Redis
+    return sum(map(store.values.__contains__, keys))
+
+
+def _is_literal(pattern: str) -> bool:
+    return "*" not in pattern and "?" not in pattern and "[" not in pattern
+
+
+_WILDCARD = re.compile(r"[*?\[]")
+
+
+def _literal_prefix(pattern: str) -> str:
+    """The part of a glob before its first wildcard."""
+    m = _WILDCARD.search(pattern)
+    return pattern[: m.start()] if m else pattern
+
+
+def _match_all(_: str) -> bool:
+    return True
+
+
+@functools.lru_cache(maxsize=1024)
+def glob_matcher(pattern: str) -> Callable[[str], Any]:
+    """
+    Translate a glob to a predicate once.
+    "*", wildcard-free and plain-prefix ("foo*") patterns skip the regex
+    engine entirely.
+    """
+    if pattern == "*":
+        return _match_all
+    if _is_literal(pattern):
+        return pattern.__eq__
+    prefix = pattern[:-1]
+    if pattern[-1] == "*" and _is_literal(prefix):
+        return lambda key: key.startswith(prefix)
+    return re.compile(fnmatch.translate(pattern)).match
+
+
+def store_keys(store: Store, pattern: str = "*") -> list[str]:
+    if _is_literal(pattern):
+        # No wildcards: a single dict lookup instead of a keyspace scan
+        return [pattern] if store_get(store, pattern) is not None else []
+
+    if store.expire_heap:
+        _sweep(store, _now_ms(store))
+    matcher = glob_matcher(pattern)
+    prefix = _literal_prefix(pattern)
+    if not prefix:
+        return [k for k in store.values if matcher(k)]
+
+    # Only keys in the sorted range that starts with the prefix can match
+    sorted_keys = store.sorted_keys
+    candidates = sorted_keys.islice(sorted_keys.bisect_left(prefix))
+    return [k for k in takewhile(lambda k: k.startswith(prefix), candidates) if matcher(k)]
+
+
+def store_ttl(store: Store, key: str) -> int:
+    now = _now_ms(store)
+    _sweep(store, now)
+    if key not in store.values:
         return -2
 
-    if entry.expires_at is None:
+    expires_at = store.expires.get(key)
+    if expires_at is None:
         return -1
 
-    remaining = entry.expires_at - time.time()
-    return max(0, int(remaining))
+    return max(0, (expires_at - now) // 1000)
@@ -3,8 +3,7 @@ from __future__ import annotations
 from typing import Callable
 
 import state as _state_module
-from protocol import BulkString, RESPArray, RESPError, RESPValue, SimpleString
-from state import _lock
+from protocol import EMPTY_ARRAY, NIL, BulkString, BulkStringArray, RESPError, RESPValue
 from zset_store import (
     zset_add,
     zset_card,
@@ -17,8 +16,6 @@ from zset_store import (
     zset_score,
 )
 
-OK = SimpleString("OK")
-
 
 # ---------------------------------------------------------------------------
 # Helpers
@@ -30,19 +27,31 @@ def _err(msg: str) -> RESPError:
 
 
 def _bulk(v: str | None) -> BulkString:
-    return BulkString(v)
+    return BulkString(v) if v is not None else NIL
+
 
+def _to_array(items: list[str | None]) -> BulkStringArray:
+    return BulkStringArray(tuple(items)) if items else EMPTY_ARRAY
 
-def _to_array(items: list[str | None]) -> RESPArray:
-    return RESPArray(tuple(_bulk(i) for i in items))
 
+# Option tables are keyed by the upper- and lower-case spelling so the usual
+# forms resolve with one dict lookup; mixed case falls back to .upper().
+_NX, _XX, _GT, _LT, _CH = 1, 2, 4, 8, 16
+_ZADD_FLAGS = {
+    name: bit
+    for flag, bit in (("NX", _NX), ("XX", _XX), ("GT", _GT), ("LT", _LT), ("CH", _CH))
+    for name in (flag, flag.lower())
+}
 
-def _is_wrongtype(v) -> bool:
-    return isinstance(v, str) and v.startswith("WRONGTYPE")
+_WITHSCORES, _LIMIT = 1, 2
+_RANGE_OPTIONS = {
+    name: opt for flag, opt in (("WITHSCORES", _WITHSCORES), ("LIMIT", _LIMIT)) for name in (flag, flag.lower())
+}
 
 
-def _check(result) -> RESPError | None:
-    return _err(result) if _is_wrongtype(result) else None
+def _option(table: dict[str, int], token: str) -> int | None:
+    opt = table.get(token)
+    return opt if opt is not None else table.get(token.upper())
 
 
 def _parse_withscores_limit(args: list[str]) -> tuple[bool, int, int, str | None]:
@@ -55,11 +64,11 @@ def _parse_withscores_limit(args: list[str]) -> tuple[bool, int, int, str | None
     count = -1
     i = 0
     while i < len(args):
-        opt = args[i].upper()
-        if opt == "WITHSCORES":
+        opt = _option(_RANGE_OPTIONS, args[i])
+        if opt == _WITHSCORES:
             with_scores = True
             i += 1
-        elif opt == "LIMIT":
+        elif opt == _LIMIT:
             if i + 2 >= len(args):
                 return False, 0, -1, "ERR syntax error"
             try:
@@ -78,31 +87,26 @@ def _parse_withscores_limit(args: list[str]) -> tuple[bool, int, int, str | None
 # ---------------------------------------------------------------------------
 
 
-async def handle_zadd(args: list[str]) -> RESPValue:
+def handle_zadd(args: list[str]) -> RESPValue:
     # ZADD key [NX|XX] [GT|LT] [CH] score member [score member ...]
     if len(args) < 3:
         return _err("ERR wrong number of arguments for ZADD")
 
     key = args[0]
-    nx = xx = gt = lt = ch = False
+    flags = 0
     i = 1
 
     # Consume flags
-    flags = {"NX", "XX", "GT", "LT", "CH"}
-    while i < len(args) and args[i].upper() in flags:
-        flag = args[i].upper()
-        if flag == "NX":
-            nx = True
-        elif flag == "XX":
-            xx = True
-        elif flag == "GT":
-            gt = True
-        elif flag == "LT":
-            lt = True
-        elif flag == "CH":
-            ch = True
+    while i < len(args) and (bit := _option(_ZADD_FLAGS, args[i])) is not None:
+        flags |= bit
         i += 1
 
+    nx = bool(flags & _NX)
+    xx = bool(flags & _XX)
+    gt = bool(flags & _GT)
+    lt = bool(flags & _LT)
+    ch = bool(flags & _CH)
+
     if nx and xx:
         return _err("ERR XX and NX options at the same time are not compatible")
     if gt and lt:
@@ -115,41 +119,30 @@ async def handle_zadd(args: list[str]) -> RESPValue:
         return _err("ERR syntax error")
 
     try:
-        pairs = [(tail[j + 1], float(tail[j])) for j in range(0, len(tail), 2)]
+        pairs = [(member, float(score)) for score, member in zip(tail[::2], tail[1::2])]
     except ValueError:
         return _err("ERR value is not a valid float")
 
-    async with _lock:
-        new_store, result = zset_add(
-            _state_module._store,
-            key,
-            pairs,
-            nx=nx,
-            xx=xx,
-            gt=gt,
-            lt=lt,
-            ch=ch,
-        )
-        _state_module._store = new_store
-
-    if isinstance(result, str):
-        return _err(result)
-    return result  # int
-
-
-async def handle_zrem(args: list[str]) -> RESPValue:
+    return zset_add(
+        _state_module._store,
+        key,
+        pairs,
+        nx=nx,
+        xx=xx,
+        gt=gt,
+        lt=lt,
+        ch=ch,
+    )
+
+
+def handle_zrem(args: list[str]) -> RESPValue:
     if len(args) < 2:
         return _err("ERR wrong number of arguments for ZREM")
     key, *members = args
-    async with _lock:
-        new_store, result = zset_rem(_state_module._store, key, *members)
-        _state_module._store = new_store
-    if isinstance(result, str):
-        return _err(result)
-    return result
+    return zset_rem(_state_module._store, key, *members)
 
 
-async def handle_zincrby(args: list[str]) -> RESPValue:
+def handle_zincrby(args: list[str]) -> RESPValue:
     if len(args) != 3:
         return _err("ERR wrong number of arguments for ZINCRBY")
     key, increment_raw, member = args
@@ -157,60 +150,46 @@ async def handle_zincrby(args: list[str]) -> RESPValue:
         increment = float(increment_raw)
     except ValueError:
         return _err("ERR value is not a valid float")
-    async with _lock:
-        new_store, result = zset_incrby(_state_module._store, key, member, increment)
-        _state_module._store = new_store
-    if isinstance(result, str):
-        return _err(result)
+    result = zset_incrby(_state_module._store, key, member, increment)
     return _bulk(str(result))
 
 
-async def handle_zscore(args: list[str]) -> RESPValue:
+def handle_zscore(args: list[str]) -> RESPValue:
     if len(args) != 2:
         return _err("ERR wrong number of arguments for ZSCORE")
     result = zset_score(_state_module._store, args[0], args[1])
-    if _is_wrongtype(result):
-        return _err(result)
     return _bulk(str(result) if result is not None else None)
 
 
-async def handle_zrank(args: list[str]) -> RESPValue:
+def handle_zrank(args: list[str]) -> RESPValue:
     if len(args) != 2:
         return _err("ERR wrong number of arguments for ZRANK")
     result = zset_rank(_state_module._store, args[0], args[1], reverse=False)
-    if _is_wrongtype(result):
-        return _err(result)
     return result if result is not None else _bulk(None)
 
 
-async def handle_zrevrank(args: list[str]) -> RESPValue:
+def handle_zrevrank(args: list[str]) -> RESPValue:
     if len(args) != 2:
         return _err("ERR wrong number of arguments for ZREVRANK")
     result = zset_rank(_state_module._store, args[0], args[1], reverse=True)
-    if _is_wrongtype(result):
-        return _err(result)
     return result if result is not None else _bulk(None)
 
 
-async def handle_zcard(args: list[str]) -> RESPValue:
+def handle_zcard(args: list[str]) -> RESPValue:
     if len(args) != 1:
         return _err("ERR wrong number of arguments for ZCARD")
     result = zset_card(_state_module._store, args[0])
-    if isinstance(result, str):
-        return _err(result)
     return result
 
 
-async def handle_zcount(args: list[str]) -> RESPValue:
+def handle_zcount(args: list[str]) -> RESPValue:
     if len(args) != 3:
         return _err("ERR wrong number of arguments for ZCOUNT")
     result = zset_count(_state_module._store, args[0], args[1], args[2])
-    if isinstance(result, str):
-        return _err(result)
     return result
 
 
-async def handle_zrangebyscore(args: list[str]) -> RESPValue:
+def handle_zrangebyscore(args: list[str]) -> RESPValue:
     # ZRANGEBYSCORE key min max [WITHSCORES] [LIMIT offset count]
     if len(args) < 3:
         return _err("ERR wrong number of arguments for ZRANGEBYSCORE")
@@ -230,12 +209,10 @@ async def handle_zrangebyscore(args: list[str]) -> RESPValue:
         count=count,
         reverse=False,
     )
-    if isinstance(result, str):
-        return _err(result)
     return _to_array(result)
 
 
-async def handle_zrevrangebyscore(args: list[str]) -> RESPValue:
+def handle_zrevrangebyscore(args: list[str]) -> RESPValue:
     # ZREVRANGEBYSCORE key max min [WITHSCORES] [LIMIT offset count]
     # Note: argument order is reversed — max comes before min
     if len(args) < 3:
@@ -256,12 +233,10 @@ async def handle_zrevrangebyscore(args: list[str]) -> RESPValue:
         count=count,
         reverse=True,
     )
-    if isinstance(result, str):
-        return _err(result)
     return _to_array(result)
 
 
-async def handle_zrange(args: list[str]) -> RESPValue:
+def handle_zrange(args: list[str]) -> RESPValue:
     # ZRANGE key start stop [WITHSCORES]
     if len(args) < 3:
         return _err("ERR wrong number of arguments for ZRANGE")
@@ -273,12 +248,10 @@ async def handle_zrange(args: list[str]) -> RESPValue:
 
     with_scores = len(args) > 3 and args[3].upper() == "WITHSCORES"
     result = zset_range(_state_module._store, key, start, stop, with_scores=with_scores)
-    if isinstance(result, str):
-        return _err(result)
     return _to_array(result)
 
 
-async def handle_zrevrange(args: list[str]) -> RESPValue:
+def handle_zrevrange(args: list[str]) -> RESPValue:
     # ZREVRANGE key start stop [WITHSCORES]
     if len(args) < 3:
         return _err("ERR wrong number of arguments for ZREVRANGE")
@@ -290,8 +263,6 @@ async def handle_zrevrange(args: list[str]) -> RESPValue:
 
     with_scores = len(args) > 3 and args[3].upper() == "WITHSCORES"
     result = zset_range(_state_module._store, key, start, stop, with_scores=with_scores, reverse=True)
-    if isinstance(result, str):
-        return _err(result)
     return _to_array(result)
 
 
@@ -1,47 +1,50 @@
 from __future__ import annotations
 
-import bisect
+import functools
 import math
-from typing import NamedTuple
 
-from store import StoreEntry, store_get
+from store import CommandError, SortedList, Store, WrongTypeError, store_delete, store_get, store_put
+
 
 # ---------------------------------------------------------------------------
 # Internal data structure
 # ---------------------------------------------------------------------------
 
 
-class SortedSet(NamedTuple):
-    """
-    scores : dict[member, score]   — O(1) lookup by member
-    ranked : list[(score, member)] — kept sorted for range queries
+class SortedSet:
     """
+    scores : dict[member, score]         — O(1) lookup by member
+    ranked : SortedList[(score, member)] — O(log M) insert/remove/rank
 
-    scores: dict
-    ranked: list
+    Both are mutated in place by the write operations.
+    """
 
+    __slots__ = ("scores", "ranked")
 
-def _make_zset() -> SortedSet:
-    return SortedSet({}, [])
+    def __init__(self, scores: dict, ranked: SortedList) -> None:
+        self.scores = scores
+        self.ranked = ranked
 
 
-def _wrong_type() -> str:
-    return "WRONGTYPE Operation against a key holding the wrong kind of value"
+def _make_zset() -> SortedSet:
+    return SortedSet({}, SortedList())
 
 
-def _get_zset(store: dict, key: str) -> SortedSet | None | str:
-    entry = store_get(store, key)
-    if entry is None:
+def _get_zset(store: Store, key: str) -> SortedSet | None:
+    value = store_get(store, key)
+    if value is None:
         return None
-    if not isinstance(entry.value, SortedSet):
-        return _wrong_type()
-    return entry.value
+    if not isinstance(value, SortedSet):
+        raise WrongTypeError()
+    return value
 
 
-def _put_zset(store: dict, key: str, zset: SortedSet) -> dict:
-    existing = store.get(key)
-    expires_at = existing.expires_at if existing else None
-    return {**store, key: StoreEntry(zset, expires_at)}
+def _put_zset(store: Store, key: str, zset: SortedSet) -> None:
+    """
+    Store a newly created zset.  Existing zsets are mutated in place and keep
+    their TTL, so only new keys are written.
+    """
+    store_put(store, key, zset)
 
 
 # ---------------------------------------------------------------------------
@@ -64,28 +67,48 @@ def parse_score_bound(raw: str) -> tuple[float, bool]:
         return math.inf, False
     exclusive = raw.startswith("(")
     value = float(raw[1:] if exclusive else raw)
+    # NaN compares false against everything, so bisecting on it is meaningless
+    if math.isnan(value):
+        raise CommandError("ERR min or max is not a float")
     return value, exclusive
 
 
-def _in_range(
-    score: float,
-    min_val: float,
-    min_excl: bool,
-    max_val: float,
-    max_excl: bool,
-) -> bool:
-    lo_ok = score > min_val if min_excl else score >= min_val
-    hi_ok = score < max_val if max_excl else score <= max_val
-    return lo_ok and hi_ok
+def _score_index(ranked: SortedList, score: float, after: bool) -> int:
+    """
+    Index of the first entry whose score is >= `score` (> `score` if `after`).
+    `(score,)` sorts before every `(score, member)` pair, so it can be used
+    directly as a bisect key.
+    """
+    if after:
+        if score == math.inf:
+            return len(ranked)
+        score = math.nextafter(score, math.inf)
+    return ranked.bisect_left((score,))
+
+
+def _score_span(ranked: SortedList, min_raw: str, max_raw: str) -> tuple[int, int]:
+    """Return the [lo, hi) slice of `ranked` whose scores fall within the bounds."""
+    try:
+        min_val, min_excl = parse_score_bound(min_raw)
+        max_val, max_excl = parse_score_bound(max_raw)
+    except ValueError as e:
+        raise CommandError(f"ERR {e}") from e
+
+    lo = _score_index(ranked, min_val, after=min_excl)
+    hi = _score_index(ranked, max_val, after=not max_excl)
+    return lo, max(lo, hi)
 
 
 # ---------------------------------------------------------------------------
-# Write operations  →  (new_store, result)
+# Write operations  →  mutate the store in place, return result
+#
+# None of these await, so on the single-threaded event loop each command is
+# applied atomically without a lock.
 # ---------------------------------------------------------------------------
 
 
 def zset_add(
-    store: dict,
+    store: Store,
     key: str,
     member_score_pairs: list[tuple[str, float]],
     nx: bool = False,  # only add new
@@ -93,18 +116,18 @@ def zset_add(
     gt: bool = False,  # only update if new score > current
     lt: bool = False,  # only update if new score < current
     ch: bool = False,  # return changed count instead of added count
-) -> tuple[dict, int | str]:
+) -> int:
     """
     ZADD key [NX|XX] [GT|LT] [CH] score member [score member ...]
     Returns number of *added* members (or changed, if CH).
     """
     zset = _get_zset(store, key)
-    if isinstance(zset, str):
-        return store, zset
-    zset = zset or _make_zset()
+    is_new_key = zset is None
+    if is_new_key:
+        zset = _make_zset()
 
-    scores = dict(zset.scores)
-    ranked = list(zset.ranked)
+    scores = zset.scores
+    ranked = zset.ranked
     added = changed = 0
 
     for member, score in member_score_pairs:
@@ -125,61 +148,61 @@ def zset_add(
             changed += 1
         elif score != existing_score:
             changed += 1
-            # Remove old ranked entry
-            old_key = (existing_score, member)
-            idx = bisect.bisect_left(ranked, old_key)
-            if idx < len(ranked) and ranked[idx] == old_key:
-                ranked.pop(idx)
+            ranked.remove((existing_score, member))
+        else:
+            # Same score: the ranked entry is already in place
+            continue
 
         scores[member] = score
-        bisect.insort(ranked, (score, member))
+        ranked.add((score, member))
 
-    new_zset = SortedSet(scores, ranked)
-    new_store = _put_zset(store, key, new_zset)
-    return new_store, changed if ch else added
+    # XX, or an update-only flag, can leave a new zset empty; don't create the key
+    if is_new_key and scores:
+        _put_zset(store, key, zset)
+    return changed if ch else added
 
 
-def zset_rem(store: dict, key: str, *members: str) -> tuple[dict, int | str]:
+def zset_rem(store: Store, key: str, *members: str) -> int:
     """ZREM key member [member ...] — returns count removed."""
     zset = _get_zset(store, key)
-    if isinstance(zset, str):
-        return store, zset
     if zset is None:
-        return store, 0
+        return 0
 
-    scores = dict(zset.scores)
-    ranked = list(zset.ranked)
+    scores = zset.scores
+    ranked = zset.ranked
     removed = 0
 
     for member in members:
         score = scores.pop(member, None)
         if score is not None:
             removed += 1
-            old_key = (score, member)
-            idx = bisect.bisect_left(ranked, old_key)
-            if idx < len(ranked) and ranked[idx] == old_key:
-                ranked.pop(idx)
+            ranked.remove((score, member))
 
+    # If the zset is now empty, remove the key entirely
     if not scores:
-        new_store = {k: v for k, v in store.items() if k != key}
-        return new_store, removed
+        store_delete(store, key)
 
-    return _put_zset(store, key, SortedSet(scores, ranked)), removed
+    return removed
 
 
-def zset_incrby(store: dict, key: str, member: str, increment: float) -> tuple[dict, float | str]:
+def zset_incrby(store: Store, key: str, member: str, increment: float) -> float:
     """ZINCRBY key increment member — returns new score."""
     zset = _get_zset(store, key)
-    if isinstance(zset, str):
-        return store, zset
-    zset = zset or _make_zset()
+    current = zset.scores.get(member) if zset is not None else None
+    new_score = increment if current is None else current + increment
+    # Checked before touching scores/ranked: NaN cannot be ordered in ranked
+    if math.isnan(new_score):
+        raise CommandError("ERR resulting score is not a number (NaN)")
+
+    if zset is None:
+        zset = _make_zset()
+        _put_zset(store, key, zset)
+    if current is not None:
+        zset.ranked.remove((current, member))
 
-    current = zset.scores.get(member, 0.0)
-    new_score = current + increment
-    new_store, result = zset_add(store, key, [(member, new_score)])
-    if isinstance(result, str):
-        return store, result
-    return new_store, new_score
+    zset.scores[member] = new_score
+    zset.ranked.add((new_score, member))
+    return new_score
 
 
 # ---------------------------------------------------------------------------
@@ -187,104 +210,98 @@ def zset_incrby(store: dict, key: str, member: str, increment: float) -> tuple[d
 # ---------------------------------------------------------------------------
 
 
-def zset_score(store: dict, key: str, member: str) -> float | None | str:
+def zset_score(store: Store, key: str, member: str) -> float | None:
     """ZSCORE key member."""
     zset = _get_zset(store, key)
-    if isinstance(zset, str):
-        return zset
     if zset is None:
         return None
     return zset.scores.get(member)
 
 
-def zset_rank(store: dict, key: str, member: str, reverse: bool = False) -> int | None | str:
+def zset_rank(store: Store, key: str, member: str, reverse: bool = False) -> int | None:
     """ZRANK / ZREVRANK key member."""
     zset = _get_zset(store, key)
-    if isinstance(zset, str):
-        return zset
     if zset is None or member not in zset.scores:
         return None
     score = zset.scores[member]
-    idx = bisect.bisect_left(zset.ranked, (score, member))
+    idx = zset.ranked.index((score, member))
     return (len(zset.ranked) - 1 - idx) if reverse else idx
 
 
-def zset_card(store: dict, key: str) -> int | str:
+def zset_card(store: Store, key: str) -> int:
     """ZCARD key."""
     zset = _get_zset(store, key)
-    if isinstance(zset, str):
-        return zset
     return len(zset.scores) if zset else 0
 
 
-def zset_count(store: dict, key: str, min_raw: str, max_raw: str) -> int | str:
+def zset_count(store: Store, key: str, min_raw: str, max_raw: str) -> int:
     """ZCOUNT key min max."""
     zset = _get_zset(store, key)
-    if isinstance(zset, str):
-        return zset
     if not zset:
         return 0
-    try:
-        min_val, min_excl = parse_score_bound(min_raw)
-        max_val, max_excl = parse_score_bound(max_raw)
-    except ValueError as e:
-        return f"ERR {e}"
-
-    return sum(1 for score, _ in zset.ranked if _in_range(score, min_val, min_excl, max_val, max_excl))
+    lo, hi = _score_span(zset.ranked, min_raw, max_raw)
+    return hi - lo
 
 
 def zset_range_by_score(
-    store: dict,
+    store: Store,
     key: str,
     min_raw: str,
     max_raw: str,
     with_scores: bool = False,
     offset: int = 0,
-    count: int = -1,  # -1 means all
+    count: int = -1,  # negative means all
     reverse: bool = False,  # True = ZREVRANGEBYSCORE (max, min order)
-) -> list[str] | str:
+) -> list[str]:
     """
     Core implementation for ZRANGEBYSCORE and ZREVRANGEBYSCORE.
     Returns a flat list: [member, ...] or [member, score, ...].
     """
     zset = _get_zset(store, key)
-    if isinstance(zset, str):
-        return zset
     if not zset:
         return []
 
-    try:
-        min_val, min_excl = parse_score_bound(min_raw)
-        max_val, max_excl = parse_score_bound(max_raw)
-    except ValueError as e:
-        return f"ERR {e}"
+    lo, hi = _score_span(zset.ranked, min_raw, max_raw)
 
-    # Filter ranked list
-    matching = [
-        (score, member) for score, member in zset.ranked if _in_range(score, min_val, min_excl, max_val, max_excl)
-    ]
+    # Apply LIMIT to the index span so only the requested page is touched.
+    # Like Redis, a negative offset yields nothing and a negative count means all.
+    if offset < 0:
+        return []
+    if reverse:
+        stop = hi - offset
+        start = lo if count < 0 else max(lo, stop - count)
+    else:
+        start = lo + offset
+        stop = hi if count < 0 else min(hi, start + count)
+    if start >= stop:
+        return []
 
     # ZREVRANGEBYSCORE returns highest score first
-    if reverse:
-        matching = list(reversed(matching))
+    return _flatten(zset.ranked, start, stop, with_scores, reverse)
+
 
-    # Apply LIMIT
-    if offset:
-        matching = matching[offset:]
-    if count != -1:
-        matching = matching[:count]
+def _flatten(ranked: SortedList, start: int, stop: int, with_scores: bool, reverse: bool) -> list[str]:
+    """
+    Stream ranked[start:stop] straight into the flat reply list:
+    [member, ...] or [member, score, ...].
+    """
+    entries = ranked.islice(start, stop, reverse=reverse)
+    if not with_scores:
+        return [member for _, member in entries]
 
-    # Build output
     result = []
-    for score, member in matching:
+    for score, member in entries:
         result.append(member)
-        if with_scores:
-            result.append(_format_score(score))
+        result.append(_format_score(score))
     return result
 
 
+@functools.lru_cache(maxsize=65536)
 def _format_score(score: float) -> str:
-    """Format score the same way Redis does — integer scores have no decimal."""
+    """
+    Format score the same way Redis does — integer scores have no decimal.
+    Leaderboard scores repeat heavily across replies, so results are cached.
+    """
     if math.isinf(score):
         return "+inf" if score > 0 else "-inf"
     if score == int(score):
@@ -293,17 +310,15 @@ def _format_score(score: float) -> str:
 
 
 def zset_range(
-    store: dict,
+    store: Store,
     key: str,
     start: int,
     stop: int,
     with_scores: bool = False,
     reverse: bool = False,
-) -> list[str] | str:
+) -> list[str]:
     """ZRANGE / ZREVRANGE — by rank index."""
     zset = _get_zset(store, key)
-    if isinstance(zset, str):
-        return zset
     if not zset:
         return []
 
@@ -320,13 +335,7 @@ def zset_range(
     if start > stop:
         return []
 
-    page = ranked[start : stop + 1]
+    # ZREVRANGE indexes count from the highest score
     if reverse:
-        page = list(reversed(page))
-
-    result = []
-    for score, member in page:
-        result.append(member)
-        if with_scores:
-            result.append(_format_score(score))
-    return result
+        start, stop = length - 1 - stop, length - 1 - start
+    return _flatten(ranked, start, stop + 1, with_scores, reverse)
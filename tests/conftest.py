@@ -1,12 +1,9 @@
-import asyncio
-
 import pytest
 
-import commands
+import state
 from store import make_store
 
 
 @pytest.fixture(autouse=True)
-def reset_command_state() -> None:
-    commands._store = make_store()
-    commands._lock = asyncio.Lock()
+def reset_command_state(monkeypatch) -> None:
+    monkeypatch.setattr(state, "_store", make_store())
@@ -1,86 +1,287 @@
 import pytest
 
+import state
 import store
+import zset_store
 from commands import dispatch
-from protocol import BulkString, RESPArray, RESPError, SimpleString
+from protocol import BulkString, BulkStringArray, RESPArray, RESPError, SimpleString
 
 
-@pytest.mark.asyncio
-async def test_dispatch_empty_and_unknown_command() -> None:
-    assert await dispatch([]) == RESPError("ERR empty command")
-    assert await dispatch(["UNKNOWN"]) == RESPError("ERR unknown command 'UNKNOWN'")
+def test_dispatch_empty_and_unknown_command() -> None:
+    assert dispatch([]) == RESPError("ERR empty command")
+    assert dispatch(["UNKNOWN"]) == RESPError("ERR unknown command 'UNKNOWN'")
+    assert dispatch(["unknown"]) == RESPError("ERR unknown command 'UNKNOWN'")
 
 
-@pytest.mark.asyncio
-async def test_ping_set_get_exists_del_flow() -> None:
-    assert await dispatch(["PING"]) == SimpleString("PONG")
-    assert await dispatch(["PING", "hello"]) == SimpleString("hello")
+def test_dispatch_is_case_insensitive() -> None:
+    assert dispatch(["ping"]) == SimpleString("PONG")
+    assert dispatch(["Ping"]) == SimpleString("PONG")
+    assert dispatch(["hset", "case-h", "f", "v"]) == 1
+    assert dispatch(["zAdd", "case-z", "1", "m"]) == 1
 
-    assert await dispatch(["SET", "a", "1"]) == SimpleString("OK")
-    assert await dispatch(["GET", "a"]) == BulkString("1")
-    assert await dispatch(["EXISTS", "a", "b"]) == 1
-    assert await dispatch(["DEL", "a", "b"]) == 1
-    assert await dispatch(["GET", "a"]) == BulkString(None)
 
+def test_ping_set_get_exists_del_flow() -> None:
+    assert dispatch(["PING"]) == SimpleString("PONG")
+    assert dispatch(["PING", "hello"]) == SimpleString("hello")
 
-@pytest.mark.asyncio
-async def test_keys_matches_pattern() -> None:
-    assert await dispatch(["SET", "foo1", "v1"]) == SimpleString("OK")
-    assert await dispatch(["SET", "foo2", "v2"]) == SimpleString("OK")
-    assert await dispatch(["SET", "bar1", "v3"]) == SimpleString("OK")
+    assert dispatch(["SET", "a", "1"]) == SimpleString("OK")
+    assert dispatch(["GET", "a"]) == BulkString("1")
+    assert dispatch(["EXISTS", "a", "b"]) == 1
+    assert dispatch(["DEL", "a", "b"]) == 1
+    assert dispatch(["GET", "a"]) == BulkString(None)
 
-    value = await dispatch(["KEYS", "foo*"])
-    assert isinstance(value, RESPArray)
-    assert [item.value for item in value.items if isinstance(item, BulkString)] == ["foo1", "foo2"]
 
+def test_keys_matches_pattern() -> None:
+    assert dispatch(["SET", "foo1", "v1"]) == SimpleString("OK")
+    assert dispatch(["SET", "foo2", "v2"]) == SimpleString("OK")
+    assert dispatch(["SET", "bar1", "v3"]) == SimpleString("OK")
 
-@pytest.mark.asyncio
-async def test_incr_happy_path_and_non_integer_error() -> None:
-    assert await dispatch(["INCR", "counter"]) == 1
-    assert await dispatch(["INCR", "counter"]) == 2
-    assert await dispatch(["GET", "counter"]) == BulkString("2")
+    assert dispatch(["KEYS", "foo*"]) == BulkStringArray(("foo1", "foo2"))
 
-    assert await dispatch(["SET", "not-int", "abc"]) == SimpleString("OK")
-    assert await dispatch(["INCR", "not-int"]) == RESPError("ERR value is not an integer")
 
+def test_incr_happy_path_and_non_integer_error() -> None:
+    assert dispatch(["INCR", "counter"]) == 1
+    assert dispatch(["INCR", "counter"]) == 2
+    assert dispatch(["GET", "counter"]) == BulkString("2")
 
-@pytest.mark.asyncio
-async def test_ttl_and_expire_with_deterministic_time(monkeypatch) -> None:
+    assert dispatch(["SET", "not-int", "abc"]) == SimpleString("OK")
+    assert dispatch(["INCR", "not-int"]) == RESPError("ERR value is not an integer")
+
+
+def test_ttl_and_expire_with_deterministic_time(monkeypatch) -> None:
     now = {"value": 100.0}
-    monkeypatch.setattr(store.time, "time", lambda: now["value"])
+    monkeypatch.setattr(state._store, "clock", lambda: now["value"])
 
-    assert await dispatch(["SET", "session", "v", "EX", "10"]) == SimpleString("OK")
-    assert await dispatch(["TTL", "session"]) == 10
+    assert dispatch(["SET", "session", "v", "EX", "10"]) == SimpleString("OK")
+    assert dispatch(["TTL", "session"]) == 10
 
     now["value"] = 104.0
-    assert await dispatch(["TTL", "session"]) == 6
+    assert dispatch(["TTL", "session"]) == 6
 
-    assert await dispatch(["EXPIRE", "session", "5"]) == 1
-    assert await dispatch(["TTL", "session"]) == 5
+    assert dispatch(["EXPIRE", "session", "5"]) == 1
+    assert dispatch(["TTL", "session"]) == 5
 
-    assert await dispatch(["TTL", "missing"]) == -2
-    assert await dispatch(["SET", "persistent", "1"]) == SimpleString("OK")
-    assert await dispatch(["TTL", "persistent"]) == -1
+    assert dispatch(["TTL", "missing"]) == -2
+    assert dispatch(["SET", "persistent", "1"]) == SimpleString("OK")
+    assert dispatch(["TTL", "persistent"]) == -1
 
 
-@pytest.mark.asyncio
-async def test_argument_validation_errors() -> None:
-    assert await dispatch(["SET"]) == RESPError("ERR wrong number of arguments for SET")
-    assert await dispatch(["GET"]) == RESPError("ERR wrong number of arguments for GET")
-    assert await dispatch(["TTL"]) == RESPError("ERR wrong number of arguments for TTL")
-    assert await dispatch(["INCR"]) == RESPError("ERR wrong number of arguments for INCR")
-    assert await dispatch(["EXPIRE"]) == RESPError("ERR wrong number of arguments for EXPIRE")
-    assert await dispatch(["EXPIRE", "k"]) == RESPError("ERR wrong number of arguments for EXPIRE")
+def test_argument_validation_errors() -> None:
+    assert dispatch(["SET"]) == RESPError("ERR wrong number of arguments for SET")
+    assert dispatch(["GET"]) == RESPError("ERR wrong number of arguments for GET")
+    assert dispatch(["TTL"]) == RESPError("ERR wrong number of arguments for TTL")
+    assert dispatch(["INCR"]) == RESPError("ERR wrong number of arguments for INCR")
+    assert dispatch(["EXPIRE"]) == RESPError("ERR wrong number of arguments for EXPIRE")
+    assert dispatch(["EXPIRE", "k"]) == RESPError("ERR wrong number of arguments for EXPIRE")
 
 
-@pytest.mark.asyncio
-async def test_invalid_numeric_values_return_resp_error() -> None:
-    assert await dispatch(["SET", "k", "v", "EX", "invalid"]) == RESPError(
+def test_invalid_numeric_values_return_resp_error() -> None:
+    assert dispatch(["SET", "k", "v", "EX", "invalid"]) == RESPError(
         "ERR value is not an integer or out of range"
     )
-    assert await dispatch(["SET", "k", "v", "PX", "invalid"]) == RESPError(
+    assert dispatch(["SET", "k", "v", "PX", "invalid"]) == RESPError(
         "ERR value is not an integer or out of range"
     )
-    assert await dispatch(["EXPIRE", "k", "invalid"]) == RESPError(
+    assert dispatch(["EXPIRE", "k", "invalid"]) == RESPError(
         "ERR value is not an integer or out of range"
     )
+
+
+def test_hash_write_commands_update_and_remove_key() -> None:
+    assert dispatch(["HSET", "h", "f1", "a", "f2", "b"]) == 2
+    assert dispatch(["HSET", "h", "f1", "z"]) == 0
+    assert dispatch(["HSETNX", "h", "f1", "nope"]) == 0
+    assert dispatch(["HINCRBY", "h", "n", "5"]) == 5
+    assert dispatch(["HGET", "h", "f1"]) == BulkString("z")
+    assert dispatch(["HLEN", "h"]) == 3
+
+    assert dispatch(["HDEL", "h", "f1", "f2", "n", "missing"]) == 3
+    assert dispatch(["EXISTS", "h"]) == 0
+
+
+def test_hscan_pages_through_matching_fields() -> None:
+    assert dispatch(["HSET", "scan-h", "a1", "1", "b1", "2", "a2", "3", "a3", "4"]) == 4
+
+    first = dispatch(["HSCAN", "scan-h", "0", "MATCH", "a*", "COUNT", "2"])
+    assert first == RESPArray((BulkString("3"), BulkStringArray(("a1", "1", "a2", "3"))))
+
+    second = dispatch(["HSCAN", "scan-h", "3", "MATCH", "a*", "COUNT", "2"])
+    assert second == RESPArray((BulkString("0"), BulkStringArray(("a3", "4"))))
+
+
+def test_counters_read_back_as_strings() -> None:
+    assert dispatch(["SET", "ctr", "41"]) == SimpleString("OK")
+    assert dispatch(["INCR", "ctr"]) == 42
+    assert dispatch(["INCR", "ctr"]) == 43
+    assert dispatch(["GET", "ctr"]) == BulkString("43")
+
+    assert dispatch(["HINCRBY", "ctr-h", "n", "10"]) == 10
+    assert dispatch(["HINCRBY", "ctr-h", "n", "-3"]) == 7
+    assert dispatch(["HGET", "ctr-h", "n"]) == BulkString("7")
+    assert dispatch(["HMGET", "ctr-h", "n", "missing"]) == BulkStringArray(("7", None))
+    assert dispatch(["HGETALL", "ctr-h"]) == BulkStringArray(("n", "7"))
+    assert dispatch(["HSTRLEN", "ctr-h", "n"]) == 1
+
+
+def test_zadd_parses_score_member_pairs() -> None:
+    assert dispatch(["ZADD", "pairs-z", "2", "b", "1", "a", "3", "c"]) == 3
+    assert dispatch(["ZRANGE", "pairs-z", "0", "-1", "WITHSCORES"]) == BulkStringArray(
+        ("a", "1", "b", "2", "c", "3")
+    )
+    assert dispatch(["ZADD", "pairs-z", "1", "a", "oops"]) == RESPError("ERR syntax error")
+
+
+def test_type_and_value_errors_from_stores_become_resp_errors() -> None:
+    wrong_type = RESPError("WRONGTYPE Operation against a key holding the wrong kind of value")
+    assert dispatch(["HSET", "err-h", "f", "WRONGTYPE is just a value"]) == 1
+    assert dispatch(["HGET", "err-h", "f"]) == BulkString("WRONGTYPE is just a value")
+    assert dispatch(["ZADD", "err-h", "1", "m"]) == wrong_type
+    assert dispatch(["ZSCORE", "err-h", "m"]) == wrong_type
+
+    assert dispatch(["ZADD", "err-z", "1", "m"]) == 1
+    assert dispatch(["HGET", "err-z", "f"]) == wrong_type
+    assert dispatch(["HINCRBY", "err-z", "f", "1"]) == wrong_type
+
+    assert dispatch(["HINCRBY", "err-h", "f", "1"]) == RESPError("ERR hash value is not an integer")
+    assert dispatch(["HINCRBYFLOAT", "err-h", "n", "1.5"]) == BulkString("1.5")
+
+
+def test_zrem_removes_members_and_empty_key() -> None:
+    assert dispatch(["ZADD", "rem-z", "1", "a", "2", "b"]) == 2
+    assert dispatch(["ZREM", "rem-z", "a", "missing"]) == 1
+    assert dispatch(["ZCARD", "rem-z"]) == 1
+    assert dispatch(["ZREM", "rem-z", "b"]) == 1
+    assert dispatch(["EXISTS", "rem-z"]) == 0
+    assert dispatch(["ZREM", "rem-z", "b"]) == 0
+
+
+def test_zset_updates_keep_ranking_consistent() -> None:
+    assert dispatch(["ZADD", "rank-z", "10", "a", "20", "b", "30", "c"]) == 3
+    assert dispatch(["ZADD", "rank-z", "10", "a"]) == 0
+    assert dispatch(["ZADD", "rank-z", "CH", "25", "a"]) == 1
+    assert dispatch(["ZINCRBY", "rank-z", "-20", "c"]) == BulkString("10.0")
+
+    assert dispatch(["ZRANGE", "rank-z", "0", "-1"]) == BulkStringArray(("c", "b", "a"))
+    assert dispatch(["ZRANK", "rank-z", "a"]) == 2
+    assert dispatch(["ZREVRANK", "rank-z", "a"]) == 0
+    assert dispatch(["ZRANK", "rank-z", "missing"]) == BulkString(None)
+    assert dispatch(["ZCARD", "rank-z"]) == 3
+
+
+def test_zset_score_ranges_honour_bounds_and_limit() -> None:
+    assert dispatch(["ZADD", "score-z", "1", "a", "2", "b", "2", "c", "3", "d", "4", "e"]) == 5
+
+    assert dispatch(["ZCOUNT", "score-z", "-inf", "+inf"]) == 5
+    assert dispatch(["ZCOUNT", "score-z", "2", "3"]) == 3
+    assert dispatch(["ZCOUNT", "score-z", "(2", "(4"]) == 1
+    assert dispatch(["ZCOUNT", "score-z", "3", "2"]) == 0
+
+    assert dispatch(["ZRANGEBYSCORE", "score-z", "(1", "3"]) == BulkStringArray(("b", "c", "d"))
+    assert dispatch(["ZRANGEBYSCORE", "score-z", "2", "+inf", "WITHSCORES", "LIMIT", "1", "2"]) == (
+        BulkStringArray(("c", "2", "d", "3"))
+    )
+    assert dispatch(["ZREVRANGEBYSCORE", "score-z", "+inf", "(2", "LIMIT", "1", "5"]) == BulkStringArray(("d",))
+    assert dispatch(["ZCOUNT", "score-z", "x", "1"]) == RESPError("ERR could not convert string to float: 'x'")
+
+
+def test_zset_options_are_case_insensitive() -> None:
+    assert dispatch(["ZADD", "opt-z", "nx", "1", "a", "2", "b"]) == 2
+    assert dispatch(["ZADD", "opt-z", "Xx", "ch", "5", "a", "9", "missing"]) == 1
+    assert dispatch(["ZADD", "opt-z", "nx", "xx", "1", "a"]) == RESPError(
+        "ERR XX and NX options at the same time are not compatible"
+    )
+    assert dispatch(["ZRANGEBYSCORE", "opt-z", "-inf", "+inf", "withscores", "Limit", "0", "1"]) == (
+        BulkStringArray(("b", "2"))
+    )
+
+
+def test_zrange_and_zrevrange_index_from_opposite_ends() -> None:
+    assert dispatch(["ZADD", "idx-z", "1", "a", "2", "b", "3", "c", "4", "d"]) == 4
+
+    assert dispatch(["ZRANGE", "idx-z", "1", "2"]) == BulkStringArray(("b", "c"))
+    assert dispatch(["ZREVRANGE", "idx-z", "0", "1"]) == BulkStringArray(("d", "c"))
+    assert dispatch(["ZREVRANGE", "idx-z", "-1", "-1", "WITHSCORES"]) == BulkStringArray(("a", "1"))
+    assert dispatch(["ZREVRANGE", "idx-z", "5", "9"]) == BulkStringArray(())
+
+
+def test_zadd_xx_on_missing_key_does_not_create_it() -> None:
+    assert dispatch(["ZADD", "xx-z", "XX", "1", "a"]) == 0
+    assert dispatch(["EXISTS", "xx-z"]) == 0
+    assert dispatch(["ZADD", "xx-z", "1", "a"]) == 1
+
+
+def test_zincrby_creates_and_reorders_members() -> None:
+    assert dispatch(["ZINCRBY", "incr-z", "5", "a"]) == BulkString("5.0")
+    assert dispatch(["ZINCRBY", "incr-z", "2", "b"]) == BulkString("2.0")
+    assert dispatch(["ZINCRBY", "incr-z", "-4", "a"]) == BulkString("1.0")
+    assert dispatch(["ZRANGE", "incr-z", "0", "-1", "WITHSCORES"]) == BulkStringArray(("a", "1", "b", "2"))
+    assert dispatch(["ZCARD", "incr-z"]) == 2
+
+
+def test_mget_returns_nil_for_missing_and_non_string_keys() -> None:
+    assert dispatch(["SET", "mget-a", "x"]) == SimpleString("OK")
+    assert dispatch(["INCR", "mget-n"]) == 1
+    assert dispatch(["HSET", "mget-h", "f", "v"]) == 1
+
+    assert dispatch(["MGET", "mget-a", "missing", "mget-n", "mget-h"]) == BulkStringArray(("x", None, "1", None))
+    assert dispatch(["MGET"]) == RESPError("ERR wrong number of arguments for MGET")
+
+
+@pytest.mark.parametrize("sorted_list", [store.SortedList, store._BisectList])
+def test_zset_commands_behave_the_same_on_either_sorted_list(monkeypatch, sorted_list) -> None:
+    monkeypatch.setattr(store, "SortedList", sorted_list)
+    monkeypatch.setattr(zset_store, "SortedList", sorted_list)
+    monkeypatch.setattr(state, "_store", store.make_store())
+
+    assert dispatch(["ZADD", "fb-z", "3", "c", "1", "a", "2", "b", "4", "d"]) == 4
+    assert dispatch(["ZINCRBY", "fb-z", "10", "a"]) == BulkString("11.0")
+    assert dispatch(["ZREM", "fb-z", "c"]) == 1
+    assert dispatch(["ZRANGE", "fb-z", "0", "-1"]) == BulkStringArray(("b", "d", "a"))
+    assert dispatch(["ZREVRANGE", "fb-z", "0", "0", "WITHSCORES"]) == BulkStringArray(("a", "11"))
+    assert dispatch(["ZRANGEBYSCORE", "fb-z", "(2", "+inf"]) == BulkStringArray(("d", "a"))
+    assert dispatch(["ZRANK", "fb-z", "d"]) == 1
+    assert dispatch(["ZCOUNT", "fb-z", "-inf", "4"]) == 2
+    assert dispatch(["KEYS", "fb-*"]) == BulkStringArray(("fb-z",))
+
+
+def test_get_and_incr_reject_non_string_values() -> None:
+    wrong_type = RESPError("WRONGTYPE Operation against a key holding the wrong kind of value")
+    assert dispatch(["HSET", "type-h", "f", "v"]) == 1
+    assert dispatch(["ZADD", "type-z", "1", "m"]) == 1
+
+    assert dispatch(["GET", "type-h"]) == wrong_type
+    assert dispatch(["GET", "type-z"]) == wrong_type
+    assert dispatch(["INCR", "type-h"]) == wrong_type
+    assert dispatch(["INCR", "type-z"]) == wrong_type
+    assert dispatch(["HGET", "type-h", "f"]) == BulkString("v")
+
+
+def test_hscan_rejects_count_below_one() -> None:
+    assert dispatch(["HSET", "scan-c", "f", "v"]) == 1
+    assert dispatch(["HSCAN", "scan-c", "0", "COUNT", "0"]) == RESPError("ERR syntax error")
+    assert dispatch(["HSCAN", "scan-c", "0", "COUNT", "-3"]) == RESPError("ERR syntax error")
+
+
+def test_hscan_rejects_negative_cursor() -> None:
+    assert dispatch(["HSET", "scan-n", "f", "v"]) == 1
+    assert dispatch(["HSCAN", "scan-n", "-1"]) == RESPError("ERR invalid cursor")
+
+
+def test_zset_score_ranges_reject_nan_bounds() -> None:
+    nan_error = RESPError("ERR min or max is not a float")
+    assert dispatch(["ZADD", "nan-z", "1", "a", "2", "b"]) == 2
+    assert dispatch(["ZRANGEBYSCORE", "nan-z", "nan", "+inf"]) == nan_error
+    assert dispatch(["ZCOUNT", "nan-z", "-inf", "(nan"]) == nan_error
+    assert dispatch(["ZCARD", "nan-z"]) == 2
+
+
+def test_zincrby_rejects_nan_result_and_keeps_member() -> None:
+    nan_error = RESPError("ERR resulting score is not a number (NaN)")
+    assert dispatch(["ZINCRBY", "nan-incr", "inf", "m"]) == BulkString("inf")
+    assert dispatch(["ZINCRBY", "nan-incr", "-inf", "m"]) == nan_error
+    assert dispatch(["ZINCRBY", "nan-new", "nan", "m"]) == nan_error
+    assert dispatch(["EXISTS", "nan-new"]) == 0
+
+    assert dispatch(["ZRANGE", "nan-incr", "0", "-1", "WITHSCORES"]) == BulkStringArray(("m", "+inf"))
+    assert dispatch(["ZREM", "nan-incr", "m"]) == 1
+    assert dispatch(["EXISTS", "nan-incr"]) == 0
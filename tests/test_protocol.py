@@ -1,6 +1,27 @@
 import pytest
 
-from protocol import BulkString, RESPArray, RESPError, SimpleString, parse, serialize
+from protocol import (
+    EMPTY_ARRAY,
+    NIL,
+    OK,
+    PONG,
+    BulkString,
+    BulkStringArray,
+    HiredisParser,
+    PythonParser,
+    RESPArray,
+    RESPError,
+    SimpleString,
+    hiredis,
+    parse,
+    parse_at,
+    serialize,
+)
+
+PARSERS = [
+    PythonParser,
+    pytest.param(HiredisParser, marks=pytest.mark.skipif(hiredis is None, reason="hiredis not installed")),
+]
 
 
 def test_parse_simple_string_with_remaining_buffer() -> None:
@@ -31,18 +52,74 @@ def test_parse_error_integer_bulk_and_array() -> None:
     assert rest == b""
 
 
+def test_parse_nested_arrays() -> None:
+    value, rest = parse(b"*3\r\n*2\r\n:1\r\n*0\r\n$1\r\na\r\n*1\r\n$-1\r\ntail")
+    assert value == RESPArray(
+        (
+            RESPArray((1, RESPArray(()))),
+            BulkString("a"),
+            RESPArray((BulkString(None),)),
+        )
+    )
+    assert rest == b"tail"
+
+
+def test_parse_command_array_with_ascii_and_non_ascii_arguments() -> None:
+    value, rest = parse(b"*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$5\r\ncaf\xc3\xa9\r\n*1")
+    assert value == RESPArray((BulkString("SET"), BulkString("k"), BulkString("café")))
+    assert rest == b"*1"
+
+    value, rest = parse(b"*2\r\n$4\r\nPING\r\n$0\r\n\r\n")
+    assert value == RESPArray((BulkString("PING"), BulkString("")))
+    assert rest == b""
+
+
+def test_parse_at_reads_from_offset_and_returns_end_offset() -> None:
+    data = bytearray(b"+OK\r\n*2\r\n$3\r\nGET\r\n$1\r\nk\r\n:5\r\n")
+    value, pos = parse_at(data, 0)
+    assert (value, pos) == (SimpleString("OK"), 5)
+    value, pos = parse_at(data, pos)
+    assert value == RESPArray((BulkString("GET"), BulkString("k")))
+    value, pos = parse_at(data, pos)
+    assert (value, pos) == (5, len(data))
+
+
 @pytest.mark.parametrize(
     ("value", "expected"),
     [
         (SimpleString("PONG"), b"+PONG\r\n"),
+        (OK, b"+OK\r\n"),
+        (PONG, b"+PONG\r\n"),
+        (NIL, b"$-1\r\n"),
+        (EMPTY_ARRAY, b"*0\r\n"),
         (RESPError("ERR boom"), b"-ERR boom\r\n"),
         (7, b":7\r\n"),
+        (-2, b":-2\r\n"),
+        (1024, b":1024\r\n"),
+        (1025, b":1025\r\n"),
+        (-99, b":-99\r\n"),
+        (True, b":1\r\n"),
+        (False, b":0\r\n"),
         (BulkString(None), b"$-1\r\n"),
         (BulkString("abc"), b"$3\r\nabc\r\n"),
+        (BulkString("café"), b"$5\r\ncaf\xc3\xa9\r\n"),
+        (BulkString("x" * 4095), b"$4095\r\n" + b"x" * 4095 + b"\r\n"),
+        (BulkString("x" * 4096), b"$4096\r\n" + b"x" * 4096 + b"\r\n"),
         (
             RESPArray((BulkString("PING"), BulkString("hello"))),
             b"*2\r\n$4\r\nPING\r\n$5\r\nhello\r\n",
         ),
+        (BulkStringArray(()), b"*0\r\n"),
+        (BulkStringArray(("a", "é")), b"*2\r\n$1\r\na\r\n$2\r\n\xc3\xa9\r\n"),
+        (BulkStringArray(("a", None)), b"*2\r\n$1\r\na\r\n$-1\r\n"),
+        (
+            RESPArray((BulkString("0"), BulkStringArray(("f", None)))),
+            b"*2\r\n$1\r\n0\r\n*2\r\n$1\r\nf\r\n$-1\r\n",
+        ),
+        (
+            RESPArray((BulkString("0"), RESPArray((BulkString("f"), BulkString(None), 3)))),
+            b"*2\r\n$1\r\n0\r\n*3\r\n$1\r\nf\r\n$-1\r\n:3\r\n",
+        ),
     ],
 )
 def test_serialize_values(value, expected: bytes) -> None:
@@ -55,6 +132,8 @@ def test_serialize_values(value, expected: bytes) -> None:
         b"+OK",
         b"$5\r\nabc\r\n",
         b"*2\r\n+OK\r\n",
+        b"*2\r\n*1\r\n:1\r\n",
+        b"*2\r\n$3\r\nGET\r\n$5\r\nab",
     ],
 )
 def test_parse_incomplete_payload_raises_value_error(payload: bytes) -> None:
@@ -68,7 +147,45 @@ def test_parse_unknown_prefix_raises_value_error() -> None:
 
 
 def test_serialize_parse_roundtrip() -> None:
-    original = RESPArray((SimpleString("HELLO"), 9, BulkString("world"), BulkString(None)))
+    original = RESPArray((SimpleString("HELLO"), 9, BulkString("world"), BulkString("ünïcödé"), BulkString(None)))
     parsed, rest = parse(serialize(original))
     assert parsed == original
     assert rest == b""
+
+
+@pytest.mark.parametrize("parser_cls", PARSERS)
+def test_parser_reassembles_split_and_pipelined_frames(parser_cls) -> None:
+    parser = parser_cls()
+    assert parser.gets() is False
+
+    parser.feed(b"*2\r\n$3\r\nGET\r\n$1")
+    assert parser.gets() is False
+
+    parser.feed(b"\r\na\r\n:7\r\n-ERR boom\r\n$-1\r\n")
+    assert parser.gets() == RESPArray((BulkString("GET"), BulkString("a")))
+    assert parser.gets() == 7
+    assert parser.gets() == RESPError("ERR boom")
+    assert parser.gets() == BulkString(None)
+    assert parser.gets() is False
+
+
+@pytest.mark.parametrize("parser_cls", PARSERS)
+def test_parser_gets_command_returns_string_arguments(parser_cls) -> None:
+    parser = parser_cls()
+    parser.feed(b"*3\r\n$3\r\nSET\r\n$1\r\nk\r\n$5\r\ncaf\xc3\xa9\r\n+PING\r\n*3\r\n$4\r\nECHO\r\n$-1\r\n:1\r\n*1")
+    assert parser.gets_command() == ["SET", "k", "café"]
+    assert parser.gets_command() is None
+    assert parser.gets_command() == ["ECHO"]
+    assert parser.gets_command() is False
+
+
+@pytest.mark.parametrize("parser_cls", PARSERS)
+def test_parser_gets_command_resumes_across_single_byte_feeds(parser_cls) -> None:
+    parser = parser_cls()
+    payload = b"*3\r\n$3\r\nSET\r\n$3\r\nkey\r\n$5\r\nhello\r\n*1\r\n$4\r\nPING\r\n"
+    commands = []
+    for i in range(len(payload)):
+        parser.feed(payload[i : i + 1])
+        while (args := parser.gets_command()) is not False:
+            commands.append(args)
+    assert commands == [["SET", "key", "hello"], ["PING"]]
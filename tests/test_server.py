@@ -1,24 +1,35 @@
 import asyncio
+from collections import deque
 
 import pytest
 
-from server import handle_client
+from commands import COMMAND_REGISTRY
+from server import RedisProtocol, handle_client
 
 
 class FakeReader:
     def __init__(self, chunks: list[bytes]):
-        self._chunks = list(chunks)
+        self._chunks = deque(chunks)
 
     async def read(self, _: int) -> bytes:
-        await asyncio.sleep(0)
         if self._chunks:
-            return self._chunks.pop(0)
+            return self._chunks.popleft()
+        # Yield once at end of stream, like a socket waiting on EOF
+        await asyncio.sleep(0)
         return b""
 
 
 class FakeWriter:
-    def __init__(self) -> None:
+    """
+    Records replies as a list of writes, or with ``accumulate=True`` appends
+    them to a single ``buf`` so high-volume harnesses avoid a list entry per
+    reply.
+    """
+
+    def __init__(self, accumulate: bool = False) -> None:
         self.writes: list[bytes] = []
+        self.buf = bytearray()
+        self.accumulate = accumulate
         self.closed = False
         self.drain_calls = 0
 
@@ -28,19 +39,27 @@ class FakeWriter:
         return None
 
     def write(self, data: bytes) -> None:
-        self.writes.append(data)
+        if self.accumulate:
+            self.buf += data
+        else:
+            self.writes.append(data)
+
+    def writelines(self, data: list[bytes]) -> None:
+        if self.accumulate:
+            self.buf += b"".join(data)
+        else:
+            self.writes.extend(data)
 
     async def drain(self) -> None:
         self.drain_calls += 1
-        await asyncio.sleep(0)
 
     def close(self) -> None:
         self.closed = True
 
 
-async def _run_client(chunks: list[bytes]) -> FakeWriter:
+async def _run_client(chunks: list[bytes], accumulate: bool = False) -> FakeWriter:
     reader = FakeReader([*chunks, b""])
-    writer = FakeWriter()
+    writer = FakeWriter(accumulate=accumulate)
     await handle_client(reader, writer)
     return writer
 
@@ -63,7 +82,7 @@ async def test_handle_client_processes_pipelined_commands() -> None:
     )
     writer = await _run_client([payload])
     assert writer.writes == [b"+OK\r\n", b"$1\r\n1\r\n"]
-    assert writer.drain_calls == 2
+    assert writer.drain_calls == 1
     assert writer.closed is True
 
 
@@ -81,3 +100,83 @@ async def test_handle_client_non_array_payload_returns_error_and_continues() ->
     assert writer.writes == [b"-ERR expected array\r\n", b"+PONG\r\n"]
     assert writer.drain_calls == 1
     assert writer.closed is True
+
+
+@pytest.mark.asyncio
+async def test_handle_client_flushes_large_batches_early(monkeypatch) -> None:
+    monkeypatch.setattr("server._FLUSH_THRESHOLD", 8)
+    writer = await _run_client([b"*1\r\n$4\r\nPING\r\n" * 3])
+    assert writer.writes == [b"+PONG\r\n"] * 3
+    assert writer.drain_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_handle_client_flushes_complete_replies_before_waiting_for_partial_frame() -> None:
+    writer = await _run_client([b"*1\r\n$4\r\nPING\r\n*1\r\n$4\r\nPI", b"NG\r\n"])
+    assert writer.writes == [b"+PONG\r\n", b"+PONG\r\n"]
+    assert writer.drain_calls == 2
+
+
+@pytest.mark.asyncio
+async def test_handle_client_failing_command_keeps_earlier_replies(monkeypatch) -> None:
+    def handle_boom(args: list[str]):
+        raise ValueError("boom")
+
+    monkeypatch.setitem(COMMAND_REGISTRY, "BOOM", handle_boom)
+    writer = await _run_client([b"*1\r\n$4\r\nPING\r\n*1\r\n$4\r\nBOOM\r\n*1\r\n$4\r\nPING\r\n"])
+    assert writer.writes == [b"+PONG\r\n", b"-ERR boom\r\n", b"+PONG\r\n"]
+    assert writer.drain_calls == 1
+
+
+@pytest.mark.asyncio
+async def test_handle_client_accumulating_writer_collects_one_buffer() -> None:
+    writer = await _run_client([b"*1\r\n$4\r\nPING\r\n" * 500], accumulate=True)
+    assert writer.buf == b"+PONG\r\n" * 500
+    assert writer.writes == []
+    assert writer.drain_calls == 1
+
+
+class FakeTransport(FakeWriter):
+    def __init__(self) -> None:
+        super().__init__()
+        self.reading = True
+
+    def pause_reading(self) -> None:
+        self.reading = False
+
+    def resume_reading(self) -> None:
+        self.reading = True
+
+
+def test_redis_protocol_executes_commands_synchronously_per_chunk() -> None:
+    transport = FakeTransport()
+    protocol = RedisProtocol()
+    protocol.connection_made(transport)
+
+    protocol.data_received(b"*3\r\n$3\r\nSET\r\n$5\r\nproto\r\n$1\r\n1\r\n*2\r\n$3\r\nGET\r\n$5\r\npr")
+    assert transport.writes == [b"+OK\r\n"]
+
+    protocol.data_received(b"oto\r\n+PING\r\n")
+    assert transport.writes == [b"+OK\r\n", b"$1\r\n1\r\n", b"-ERR expected array\r\n"]
+
+    protocol.pause_writing()
+    assert transport.reading is False
+    protocol.resume_writing()
+    assert transport.reading is True
+
+    protocol.connection_lost(None)
+    assert transport.closed is False
+
+
+def test_redis_protocol_keeps_connection_open_after_failing_command(monkeypatch) -> None:
+    def handle_boom(args: list[str]):
+        raise ValueError("boom")
+
+    monkeypatch.setitem(COMMAND_REGISTRY, "BOOM", handle_boom)
+    transport = FakeTransport()
+    protocol = RedisProtocol()
+    protocol.connection_made(transport)
+
+    protocol.data_received(b"*1\r\n$4\r\nBOOM\r\n*1\r\n$4\r\nPING\r\n")
+    assert transport.writes == [b"-ERR boom\r\n", b"+PONG\r\n"]
+    assert transport.closed is False
@@ -1,74 +1,197 @@
+import pytest
+
 import store
 
 
-def _freeze_time(monkeypatch, initial: float = 100.0) -> dict[str, float]:
+def _frozen_store(initial: float = 100.0) -> tuple[store.Store, dict[str, float]]:
     current = {"value": initial}
-    monkeypatch.setattr(store.time, "time", lambda: current["value"])
-    return current
+    return store.make_store(clock=lambda: current["value"]), current
+
 
+def test_store_set_and_get_without_ttl() -> None:
+    data, _ = _frozen_store()
+    store.store_set(data, "name", "redis")
 
-def test_store_set_and_get_without_ttl(monkeypatch) -> None:
-    _freeze_time(monkeypatch)
-    data = store.make_store()
-    data = store.store_set(data, "name", "redis")
+    assert store.store_get(data, "name") == "redis"
+    assert (data.values["name"], data.expires.get("name")) == ("redis", None)
 
-    entry = store.store_get(data, "name")
-    assert entry == store.StoreEntry("redis", None)
 
+def test_store_get_returns_none_for_expired_entry() -> None:
+    data, now = _frozen_store()
+    store.store_set(data, "token", "abc", ttl_seconds=5)
 
-def test_store_get_returns_none_for_expired_entry(monkeypatch) -> None:
-    now = _freeze_time(monkeypatch)
-    data = store.make_store()
-    data = store.store_set(data, "token", "abc", ttl_seconds=5)
+    assert data.expires["token"] == 105_000
 
     now["value"] = 106.0
     assert store.store_get(data, "token") is None
+    assert "token" not in data.values
+    assert "token" not in data.expires
 
 
-def test_store_delete_returns_new_store_and_deleted_count(monkeypatch) -> None:
-    _freeze_time(monkeypatch)
-    data = store.make_store()
-    data = store.store_set(data, "a", "1")
-    data = store.store_set(data, "b", "2")
+def test_store_delete_mutates_store_and_returns_deleted_count() -> None:
+    data, _ = _frozen_store()
+    store.store_set(data, "a", "1")
+    store.store_set(data, "b", "2")
 
-    new_data, deleted = store.store_delete(data, "a", "missing")
+    new_data, deleted = store.store_delete(data, "a", "missing", "a")
 
     assert deleted == 1
-    assert "a" not in new_data
-    assert "b" in new_data
-    assert "a" in data
+    assert new_data is data
+    assert "a" not in data.values
+    assert "b" in data.values
 
 
-def test_store_exists_ignores_expired_entries(monkeypatch) -> None:
-    now = _freeze_time(monkeypatch)
-    data = store.make_store()
-    data = store.store_set(data, "live", "1")
-    data = store.store_set(data, "ephemeral", "1", ttl_seconds=1)
+def test_store_exists_ignores_expired_entries() -> None:
+    data, now = _frozen_store()
+    store.store_set(data, "live", "1")
+    store.store_set(data, "ephemeral", "1", ttl_seconds=1)
 
     now["value"] = 105.0
     assert store.store_exists(data, "live", "ephemeral", "missing") == 1
+    assert store.store_exists(data, "live", "live") == 2
 
 
-def test_store_keys_applies_pattern_and_ignores_expired_entries(monkeypatch) -> None:
-    now = _freeze_time(monkeypatch)
-    data = store.make_store()
-    data = store.store_set(data, "foo", "1")
-    data = store.store_set(data, "bar", "1")
-    data = store.store_set(data, "foo-temp", "1", ttl_seconds=1)
+def test_store_keys_applies_pattern_and_ignores_expired_entries() -> None:
+    data, now = _frozen_store()
+    store.store_set(data, "foo", "1")
+    store.store_set(data, "bar", "1")
+    store.store_set(data, "foo-temp", "1", ttl_seconds=1)
 
     now["value"] = 102.0
     assert store.store_keys(data, "foo*") == ["foo"]
 
 
-def test_store_ttl_returns_expected_sentinels_and_remaining(monkeypatch) -> None:
-    now = _freeze_time(monkeypatch)
-    data = store.make_store()
+def test_store_ttl_returns_expected_sentinels_and_remaining() -> None:
+    data, now = _frozen_store()
 
     assert store.store_ttl(data, "missing") == -2
 
-    data = store.store_set(data, "persistent", "1")
+    store.store_set(data, "persistent", "1")
     assert store.store_ttl(data, "persistent") == -1
 
-    data = store.store_set(data, "session", "1", ttl_seconds=10)
+    store.store_set(data, "persistent", "1", ttl_seconds=10)
+    store.store_set(data, "persistent", "2")
+    assert store.store_ttl(data, "persistent") == -1
+    assert "persistent" not in data.expires
+
+    store.store_set(data, "session", "1", ttl_seconds=10)
     now["value"] = 105.0
     assert store.store_ttl(data, "session") == 5
+
+
+def test_store_keys_handles_match_all_and_literal_patterns() -> None:
+    data, now = _frozen_store()
+    store.store_set(data, "foo", "1")
+    store.store_set(data, "bar", "1")
+    store.store_set(data, "temp", "1", ttl_seconds=1)
+
+    assert store.store_keys(data, "*") == ["foo", "bar", "temp"]
+    assert store.store_keys(data, "foo") == ["foo"]
+    assert store.store_keys(data, "missing") == []
+
+    now["value"] = 102.0
+    assert store.store_keys(data, "*") == ["foo", "bar"]
+    assert store.store_keys(data, "temp") == []
+
+
+def test_store_expiry_ignores_overwritten_ttls() -> None:
+    data, now = _frozen_store()
+    store.store_set(data, "cleared", "1", ttl_seconds=1)
+    store.store_set(data, "cleared", "2")
+    store.store_set(data, "extended", "1", ttl_seconds=1)
+    store.store_set(data, "extended", "1", ttl_seconds=10)
+    store.store_set(data, "short", "1", ttl_seconds=1)
+
+    now["value"] = 102.0
+    assert store.store_keys(data, "*") == ["cleared", "extended"]
+    assert store.store_ttl(data, "extended") == 8
+    assert data.expire_heap == [(110_000, "extended")]
+
+
+def test_glob_matcher_prefix_patterns_match_like_fnmatch() -> None:
+    matcher = store.glob_matcher("user:*")
+    assert matcher("user:1")
+    assert matcher("user:")
+    assert not matcher("users:1")
+    assert not matcher("xuser:1")
+    assert store.glob_matcher("u*r:*")("user:1")
+
+
+@pytest.mark.parametrize("sorted_list", [store.SortedList, store._BisectList])
+def test_store_keys_prefix_patterns_track_deletes_and_expiry(monkeypatch, sorted_list) -> None:
+    monkeypatch.setattr(store, "SortedList", sorted_list)
+    data, now = _frozen_store()
+    assert type(data.sorted_keys) is sorted_list
+    for key in ("user:2:name", "user:1:name", "user:1:mail", "users", "admin:1:name"):
+        store.store_set(data, key, "v")
+    store.store_set(data, "user:3:name", "v", ttl_seconds=1)
+    store.store_delete(data, "user:2:name")
+
+    assert store.store_keys(data, "user:*") == ["user:1:mail", "user:1:name", "user:3:name"]
+    assert store.store_keys(data, "user:*:name") == ["user:1:name", "user:3:name"]
+
+    now["value"] = 102.0
+    assert store.store_keys(data, "user:*:name") == ["user:1:name"]
+    assert list(data.sorted_keys) == ["admin:1:name", "user:1:mail", "user:1:name", "users"]
+
+
+def test_store_ttls_are_kept_in_whole_milliseconds() -> None:
+    data, now = _frozen_store()
+    store.store_set(data, "px", "1", ttl_seconds=0.29)
+    store.store_set(data, "ex", "1", ttl_seconds=1.5)
+
+    assert data.expires == {"px": 100_290, "ex": 101_500}
+    assert store.store_ttl(data, "ex") == 1
+
+    now["value"] = 100.29
+    assert store.store_exists(data, "px") == 1
+    now["value"] = 100.291
+    assert store.store_exists(data, "px") == 0
+
+
+def test_store_set_shares_short_string_values() -> None:
+    data, _ = _frozen_store()
+    store.store_set(data, "a", "".join(["act", "ive"]))
+    store.store_set(data, "b", "".join(["acti", "ve"]))
+    store.store_set(data, "long-a", "x" * 65)
+    store.store_set(data, "long-b", "x" * 65)
+
+    assert data.values["a"] is data.values["b"]
+    assert data.values["long-a"] == data.values["long-b"]
+
+
+def test_store_mget_returns_values_in_order_and_skips_expired() -> None:
+    data, now = _frozen_store()
+    store.store_set(data, "live", "1")
+    store.store_set(data, "ephemeral", "2", ttl_seconds=1)
+
+    assert store.store_mget(data, ["live", "ephemeral", "missing"]) == ["1", "2", None]
+
+    now["value"] = 105.0
+    assert store.store_mget(data, ["ephemeral", "live", "live"]) == [None, "1", "1"]
+
+
+def test_bisect_list_matches_sorted_list_api() -> None:
+    items = store._BisectList(["c", "a", "d"])
+    items.add("b")
+    items.remove("d")
+
+    assert list(items) == ["a", "b", "c"]
+    assert items.index("b") == 1
+    assert (items.bisect_left("b"), items.bisect_right("b")) == (1, 2)
+    assert list(items.islice(1)) == ["b", "c"]
+    assert list(items.islice(0, 2, reverse=True)) == ["b", "a"]
+    with pytest.raises(ValueError):
+        items.remove("missing")
+
+
+def test_reads_skip_the_clock_when_no_key_has_a_ttl() -> None:
+    calls = []
+    data = store.make_store(clock=lambda: calls.append(1) or 100.0)
+    store.store_set(data, "a", "1")
+
+    assert store.store_get(data, "a") == "1"
+    assert store.store_mget(data, ["a", "b"]) == ["1", None]
+    assert store.store_exists(data, "a", "b") == 1
+    assert store.store_keys(data, "*") == ["a"]
+    assert calls == []